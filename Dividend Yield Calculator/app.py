@@ -1,12 +1,30 @@
-from flask import Flask, render_template, request, jsonify, make_response, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
+import asyncio
 import math
+import bisect
+import functools
+import json
+import hashlib
+import os
+import sys
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+import urllib.parse
+import collections
+import collections.abc
+import concurrent.futures
 import csv
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
+import itertools
+import zlib
+import zipfile
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 import logging
 
 app = Flask(__name__)
@@ -32,6 +50,215 @@ DEFAULT_TAX_SLABS = [
 # NOTE: The client-side JavaScript also has a DEFAULT_DIVIDEND_TAX_BRACKETS
 # for its D3 chart, ensure they are consistent or derive one from the other.
 
+# Sentinel returned by cache backends when a key is absent or expired.
+_CACHE_MISS = object()
+
+# Number of scenarios /api/projections validates and computes per vectorized batch.
+API_BATCH_CHUNK_SIZE = 500
+
+# Unrounded per-year checkpoints kept by the scalar projection loop, and the parsed inputs
+# that only affect reporting (so changing them never reruns the loop).
+TRACE_SERIES_KEYS = (
+    'shares_owned', 'share_price', 'annual_dividend_per_share',
+    'annual_gross_income', 'annual_after_tax_income',
+    'cumulative_gross_income', 'cumulative_after_tax_income',
+    'nominal_yield_over_time'
+)
+REPORTING_ONLY_INPUTS = ('time_horizon', 'inflation_rate_pct', 'payout_ratio', 'debt_to_equity', 'free_cash_flow', 'eps')
+
+# Series produced for every projected year by the batch engine, in projected_data order.
+BATCH_SERIES_KEYS = (
+    'shares_owned', 'share_price', 'annual_dividend_per_share',
+    'annual_gross_income', 'annual_after_tax_income',
+    'cumulative_gross_income', 'cumulative_after_tax_income',
+    'nominal_yield_over_time', 'real_yield_over_time'
+)
+
+
+# --- Instrumentation ---
+
+# Upper bounds (seconds) of the latency histogram buckets exposed at /metrics
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in the Prometheus style."""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process timing histograms for hot-path stages and HTTP requests, plus
+    request counters. Disabled registries hand out no-op spans, so
+    instrumented code costs one attribute check.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stage_histograms = collections.defaultdict(Histogram)
+        self.request_histograms = collections.defaultdict(Histogram)
+        self.request_counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            self.stage_histograms[stage].observe(seconds)
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            self.request_histograms[endpoint].observe(seconds)
+            self.request_counts[(endpoint, method, status)] += 1
+
+    def render_prometheus(self, caches, pools=None):
+        """
+        Prometheus text exposition of all metrics; caches maps a cache name to
+        its ProjectionCache and pools a pool name to its BoundedExecutor.
+        """
+        lines = []
+        with self._lock:
+            _render_histograms(lines, 'dividend_stage_duration_seconds',
+                               "Time spent in each hot-path stage.", 'stage', self.stage_histograms)
+            _render_histograms(lines, 'dividend_http_request_duration_seconds',
+                               "Time to produce each HTTP response, by endpoint.", 'endpoint', self.request_histograms)
+            lines.append("# HELP dividend_http_requests_total HTTP requests handled.")
+            lines.append("# TYPE dividend_http_requests_total counter")
+            for (endpoint, method, status), count in sorted(self.request_counts.items()):
+                lines.append(f'dividend_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+        cache_metrics = [
+            ('dividend_cache_hits_total', 'counter', "Cache lookups that found a stored value.", 'hits'),
+            ('dividend_cache_misses_total', 'counter', "Cache lookups that had to compute the value.", 'misses'),
+            ('dividend_cache_evictions_total', 'counter', "Entries evicted for size or age.", 'evictions'),
+            ('dividend_cache_entries', 'gauge', "Entries currently stored.", 'size'),
+            ('dividend_cache_hit_ratio', 'gauge', "Hits divided by lookups.", 'hit_rate'),
+        ]
+        cache_stats = {name: cache.stats() for name, cache in caches.items()}
+        for metric, metric_type, help_text, stat in cache_metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stats in cache_stats.items():
+                lines.append(f'{metric}{{cache="{name}"}} {stats[stat]}')
+
+        pool_metrics = [
+            ('dividend_offload_in_flight', 'gauge', "Offloaded requests running or queued.", 'in_flight'),
+            ('dividend_offload_capacity', 'gauge', "Offloaded requests admitted before shedding load.", 'capacity'),
+            ('dividend_offload_rejected_total', 'counter', "Requests rejected with 503 because the pool was full.", 'rejected'),
+        ]
+        pool_stats = {name: pool.stats() for name, pool in (pools or {}).items()}
+        for metric, metric_type, help_text, stat in pool_metrics if pool_stats else ():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stats in pool_stats.items():
+                lines.append(f'{metric}{{pool="{name}"}} {stats[stat]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histograms(lines, metric, help_text, label, histograms):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.total}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+
+class _Span:
+    """Times a with-block and records it as one observation of a stage."""
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.observe_stage(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class _SpanTotal:
+    """
+    Sums the time of many short with-blocks (e.g. one per projected year)
+    and records them as a single observation when record() is called.
+    """
+    __slots__ = ('stage', 'elapsed', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self.started
+        return False
+
+    def record(self):
+        metrics.observe_stage(self.stage, self.elapsed)
+
+
+class _NullSpan:
+    """Stands in for _Span and _SpanTotal while metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def record(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+metrics = MetricsRegistry(enabled=os.environ.get('DIVIDEND_METRICS', '1').lower() not in ('0', 'false', 'off'))
+
+
+def timed_span(stage):
+    """Context manager timing one stage; a shared no-op when metrics are disabled."""
+    return _Span(stage) if metrics.enabled else _NULL_SPAN
+
+
+def timed_span_total(stage):
+    """Accumulating timer for a stage split over many small blocks; see _SpanTotal."""
+    return _SpanTotal(stage) if metrics.enabled else _NULL_SPAN
+
+
+def iter_timed(stage, iterable):
+    """
+    Passes items of a (lazy) iterable through, adding the time spent producing
+    them to one observation of stage, recorded once the iterable is exhausted.
+    """
+    span_total = timed_span_total(stage)
+    iterator = iter(iterable)
+    while True:
+        with span_total:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+        yield item
+    span_total.record()
+
 
 # --- Core Calculation Functions ---
 
@@ -104,56 +331,96 @@ def calculate_dividend_yield(dividend_value, current_price, yield_type="indicate
 
     return (annualized_dividend / current_price) * 100
 
+class TaxSchedule:
+    """
+    Progressive tax schedule compiled once from parsed tax slabs.
+
+    Stores the sorted slab thresholds, their rates and the cumulative tax owed
+    at each threshold, so the tax on any income is one binary search plus one
+    multiply instead of a walk over every slab. Produces exactly the same
+    amounts as walking the slabs in order.
+    """
+    __slots__ = ('key', 'thresholds', 'rates', 'cumulative_tax',
+                 '_threshold_array', '_rate_array', '_cumulative_tax_array')
+
+    def __init__(self, tax_slabs):
+        # Ensure slabs are sorted by their lower_threshold
+        sorted_slabs = sorted(tax_slabs, key=lambda x: x['lower_threshold'])
+        self.thresholds = [slab['lower_threshold'] for slab in sorted_slabs]
+        self.rates = [slab['rate'] for slab in sorted_slabs]
+        self.key = tuple(zip(self.thresholds, self.rates))
+
+        # Tax owed on income exactly at each threshold: the sum of every full
+        # band below it, accumulated in slab order.
+        self.cumulative_tax = []
+        total_tax_liability = 0
+        for i in range(len(self.thresholds)):
+            self.cumulative_tax.append(total_tax_liability)
+            if i + 1 < len(self.thresholds):
+                total_tax_liability += (self.thresholds[i + 1] - self.thresholds[i]) * self.rates[i]
+
+        self._threshold_array = np.array(self.thresholds, dtype=float)
+        self._rate_array = np.array(self.rates, dtype=float)
+        self._cumulative_tax_array = np.array(self.cumulative_tax, dtype=float)
+
+    def tax(self, taxable_income_amount):
+        """Returns the tax owed on a single taxable income amount."""
+        i = bisect.bisect_right(self.thresholds, taxable_income_amount) - 1
+        if i < 0:
+            return 0
+        return self.cumulative_tax[i] + (taxable_income_amount - self.thresholds[i]) * self.rates[i]
+
+    def tax_array(self, taxable_income_amounts):
+        """Returns the tax owed on each element of an array of taxable incomes."""
+        taxable_income_amounts = np.asarray(taxable_income_amounts, dtype=float)
+        if not self.thresholds:
+            return np.zeros_like(taxable_income_amounts)
+        i = np.searchsorted(self._threshold_array, taxable_income_amounts, side='right') - 1
+        below_first_slab = i < 0
+        i = np.maximum(i, 0)
+        tax = self._cumulative_tax_array[i] + (taxable_income_amounts - self._threshold_array[i]) * self._rate_array[i]
+        return np.where(below_first_slab, 0.0, tax)
+
+    def after_tax_income(self, gross_income, exemption_threshold=0.0):
+        """After-tax income for one gross income, taxing only the amount above the exemption."""
+        return gross_income - self.tax(max(0, gross_income - exemption_threshold))
+
+    def after_tax_income_array(self, gross_income, exemption_threshold=0.0):
+        """Array version of after_tax_income; exemption_threshold may be a scalar or an array."""
+        gross_income = np.asarray(gross_income, dtype=float)
+        return gross_income - self.tax_array(np.maximum(0.0, gross_income - exemption_threshold))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_tax_schedule_cached(slab_key):
+    return TaxSchedule([{'lower_threshold': threshold, 'rate': rate} for threshold, rate in slab_key])
+
+
+def compile_tax_schedule(tax_slabs):
+    """
+    Returns the TaxSchedule for a list of tax slabs (as returned by
+    parse_dividend_tax_brackets_input). Schedules are cached per distinct slab
+    set, so every request using the same brackets shares one compiled object.
+    The cache key is spelled in floats, so a schedule's key does not depend
+    on whether int or float slabs (which compare equal) were compiled first.
+    """
+    if isinstance(tax_slabs, TaxSchedule):
+        return tax_slabs
+    return _compile_tax_schedule_cached(
+        tuple((float(slab['lower_threshold']), float(slab['rate'])) for slab in tax_slabs)
+    )
+
+
 def calculate_after_tax_income(gross_income, tax_slabs, exemption_threshold):
     """
     Calculates after-tax income using slab-based progressive tax rates.
     tax_slabs should be a list of dicts like [{'lower_threshold': 0, 'rate': 0.00}, ...]
+    or an already compiled TaxSchedule.
     """
     gross_income = parse_float(gross_income)
     exemption_threshold = parse_float(exemption_threshold)
 
-    # Calculate the income that is subject to taxation after exemption
-    taxable_income_amount = max(0, gross_income - exemption_threshold)
-    total_tax_liability = 0  # Renamed for clarity
-    
-    # Ensure slabs are sorted by their lower_threshold
-    sorted_slabs = sorted(tax_slabs, key=lambda x: x['lower_threshold'])
-    
-    # Iterate through each tax slab to apply progressive rates
-    for i in range(len(sorted_slabs)):
-        current_slab = sorted_slabs[i]
-        
-        # The lower bound of the current tax bracket's segment (e.g., $10,000 for the 15% bracket)
-        slab_start_threshold = current_slab['lower_threshold']
-        
-        # The upper bound of the current tax bracket's segment
-        # This is the lower_threshold of the next slab, or infinity if it's the last slab
-        slab_end_threshold = float('inf')
-        if i + 1 < len(sorted_slabs):
-            slab_end_threshold = sorted_slabs[i+1]['lower_threshold']
-        
-        rate = current_slab['rate']
-
-        # Determine the portion of the taxable income that falls within *this specific slab's range*
-        # This is the crucial part for progressive calculation.
-        
-        # 1. How much of the *taxable_income_amount* is above the current slab's start threshold?
-        income_above_start_of_slab = max(0, taxable_income_amount - slab_start_threshold)
-        
-        # 2. How much of that income falls *within the current slab's upper limit*?
-        # This is the minimum of (income above start of slab) and (the size of the current slab band)
-        # The size of the current slab band is (slab_end_threshold - slab_start_threshold)
-        taxable_in_this_segment = min(income_above_start_of_slab, slab_end_threshold - slab_start_threshold)
-        
-        # Add the calculated tax for this segment
-        total_tax_liability += taxable_in_this_segment * rate
-        
-        # If the taxable_income_amount is entirely covered by current or previous slabs, we can stop.
-        if taxable_income_amount <= slab_end_threshold:
-            break
-            
-    after_tax_income = gross_income - total_tax_liability  # Use total_tax_liability here
-    return after_tax_income
+    return compile_tax_schedule(tax_slabs).after_tax_income(gross_income, exemption_threshold)
 
 
 def calculate_real_yield(nominal_yield, inflation_rate):
@@ -202,10 +469,11 @@ def assess_sustainability_risks(payout_ratio, debt_to_equity, free_cash_flow, ep
 
 # --- Main Calculation and Projection Logic ---
 
-def calculate_all_projections(form_data):
+def parse_projection_inputs(form_data):
     """
-    Calculates dividend projections over a given time horizon, including DRIP,
-    taxation, and sustainability assessments.
+    Parses the raw form fields used by calculate_all_projections into typed values.
+    Shared by the scalar projection path and the batch engine so both read the
+    form the same way.
     """
     # Parse all inputs safely
     initial_shares = parse_float(form_data.get('initial_shares'))
@@ -224,25 +492,6 @@ def calculate_all_projections(form_data):
         frequency_map = {'monthly': 12, 'quarterly': 4, 'semi-annual': 2, 'annual': 1}
         payout_frequency_num = frequency_map.get(dividend_frequency_str, 1)
 
-    dividend_growth_rate_pct = parse_float(form_data.get('dividend_growth_rate'))
-    share_price_growth_rate_pct = parse_float(form_data.get('share_price_growth_rate'))
-    time_horizon = parse_int(form_data.get('time_horizon'))
-    
-    # --- Get and parse tax brackets from form data ---
-    tax_exemption_threshold = parse_float(form_data.get('tax_exemption_threshold', '0.00'))
-    inflation_rate_pct = parse_float(form_data.get('inflation_rate'))
-    
-    dividend_tax_brackets_input_str = form_data.get('dividend_tax_brackets_input', '')
-    parsed_tax_slabs = parse_dividend_tax_brackets_input(dividend_tax_brackets_input_str)
-    # ---------------------------------------------------
-
-    drip_enabled = form_data.get('drip_toggle') == 'on'
-
-    payout_ratio = parse_float(form_data.get('payout_ratio'))
-    debt_to_equity = parse_float(form_data.get('debt_to_equity'))
-    free_cash_flow = parse_float(form_data.get('free_cash_flow'))
-    eps = parse_float(form_data.get('eps'))
-
     # Determine which dividend value to use for initial calculations
     if selected_yield_type == 'trailing':
         current_annual_dividend_per_share = ttm_dividend
@@ -251,87 +500,317 @@ def calculate_all_projections(form_data):
     else:  # 'indicated' or default
         current_annual_dividend_per_share = annual_dividend_indicated
 
+    parsed_tax_slabs = parse_dividend_tax_brackets_input(form_data.get('dividend_tax_brackets_input', ''))
+
+    return {
+        'initial_shares': initial_shares,
+        'initial_share_price': initial_share_price,
+        'selected_yield_type': selected_yield_type,
+        'payout_frequency_num': payout_frequency_num,
+        'current_annual_dividend_per_share': current_annual_dividend_per_share,
+        'dividend_growth_rate_pct': parse_float(form_data.get('dividend_growth_rate')),
+        'share_price_growth_rate_pct': parse_float(form_data.get('share_price_growth_rate')),
+        'time_horizon': parse_int(form_data.get('time_horizon')),
+        # --- Get and parse tax brackets from form data ---
+        'tax_exemption_threshold': parse_float(form_data.get('tax_exemption_threshold', '0.00')),
+        'inflation_rate_pct': parse_float(form_data.get('inflation_rate')),
+        'parsed_tax_slabs': parsed_tax_slabs,
+        'tax_schedule': compile_tax_schedule(parsed_tax_slabs),
+        'drip_enabled': form_data.get('drip_toggle') == 'on',
+        # 'per_payout' reinvests each dividend payment as it is paid instead of once a year
+        'drip_per_payout': form_data.get('drip_compounding') == 'per_payout',
+        # Invested at the end of every year at that year's share price
+        'annual_contribution': parse_float(form_data.get('annual_contribution')),
+        'payout_ratio': parse_float(form_data.get('payout_ratio')),
+        'debt_to_equity': parse_float(form_data.get('debt_to_equity')),
+        'free_cash_flow': parse_float(form_data.get('free_cash_flow')),
+        'eps': parse_float(form_data.get('eps')),
+    }
+
+
+def calculate_all_projections(form_data):
+    """
+    Calculates dividend projections over a given time horizon, including DRIP,
+    taxation, and sustainability assessments.
+    """
+    return calculate_projections_from_inputs(parse_projection_inputs(form_data))
+
+
+def calculate_projections_from_inputs(inputs):
+    """
+    calculate_all_projections for inputs already parsed by parse_projection_inputs.
+    """
+    trace = new_projection_trace(inputs)
+    extend_projection_trace(inputs, trace, inputs['time_horizon'])
+    return build_projection_results(inputs, trace)
+
+
+def new_projection_trace(inputs):
+    """
+    Starting point of a projection trace: the running state of the year-by-year
+    loop (shares, price, payout and cumulative totals) plus the unrounded
+    per-year checkpoints it has produced so far.
+    """
+    trace = {
+        'current_shares': inputs['initial_shares'],
+        'current_share_price': inputs['initial_share_price'],
+        'current_payout_per_share': inputs['current_annual_dividend_per_share'],  # This is the base for growth
+        'cumulative_gross': 0,  # Initialize Total Cumulative Gross Dividend Income
+        'cumulative_after_tax': 0,
+    }
+    for key in TRACE_SERIES_KEYS:
+        trace[key] = []
+    return trace
+
+
+def extend_projection_trace(inputs, trace, time_horizon):
+    """
+    Runs the DRIP/tax projection loop from the year after the trace's last
+    checkpoint through time_horizon, appending one checkpoint per year and
+    updating the running state in place. Resuming a trace gives exactly the
+    values a run from year 1 would.
+    """
+    dividend_growth_rate_pct = inputs['dividend_growth_rate_pct']
+    share_price_growth_rate_pct = inputs['share_price_growth_rate_pct']
+    payout_frequency_num = inputs['payout_frequency_num']
+    tax_exemption_threshold = inputs['tax_exemption_threshold']
+    tax_schedule = inputs['tax_schedule']
+    drip_enabled = inputs['drip_enabled']
+    drip_per_payout = drip_enabled and inputs['drip_per_payout']
+    annual_contribution = inputs['annual_contribution']
+
+    current_shares = trace['current_shares']
+    current_share_price = trace['current_share_price']
+    current_payout_per_share = trace['current_payout_per_share']
+    cumulative_gross = trace['cumulative_gross']
+    cumulative_after_tax = trace['cumulative_after_tax']
+
+    tax_span = timed_span_total('tax_evaluation')
+    with timed_span('projection_loop'):
+        for year in range(len(trace['shares_owned']) + 1, time_horizon + 1):
+            # 1. Project Dividend Payout (payout-focused growth)
+            if year > 1:  # Apply growth from year 2 onwards
+                current_payout_per_share *= (1 + (dividend_growth_rate_pct / 100))
+        
+            # 2. Project Share Price
+            if year > 1:  # Apply growth from year 2 onwards
+                current_share_price *= (1 + (share_price_growth_rate_pct / 100))
+
+            # 3. Calculate Annual Gross Dividend Income for the current year
+            if drip_per_payout and current_share_price > 0:
+                # Per-payout DRIP: each payment buys shares at this year's price before the next one is paid
+                annual_gross_income = 0
+                payment_per_share = current_payout_per_share / max(payout_frequency_num, 1)
+                for _ in range(max(payout_frequency_num, 1)):
+                    payment = current_shares * payment_per_share
+                    annual_gross_income += payment
+                    current_shares += payment / current_share_price
+            else:
+                # Formula: Annual Gross Income (Current Year) = Current Shares Owned * Current Annual Dividend Per Share
+                annual_gross_income = current_shares * current_payout_per_share
+        
+            # Apply progressive tax to get Annual After-Tax Income
+            with tax_span:
+                annual_after_tax_income = tax_schedule.after_tax_income(annual_gross_income, tax_exemption_threshold)
+
+            # Accumulate Total Cumulative Gross Dividend Income
+            # Formula: Cumulative Gross (Current Year) = Cumulative Gross (Previous Year) + Annual Gross Income (Current Year)
+            cumulative_gross += annual_gross_income
+        
+            # Accumulate Total Cumulative After-Tax Dividend Income
+            cumulative_after_tax += annual_after_tax_income
+
+            # 4. DRIP Modeling (reinvest after-tax dividends)
+            if drip_enabled and current_share_price > 0:  # Only if DRIP is on and price is positive
+                if drip_per_payout:
+                    # Payments were reinvested gross; sell enough shares to cover the annual tax
+                    current_shares -= (annual_gross_income - annual_after_tax_income) / current_share_price
+                else:
+                    reinvested_shares = annual_after_tax_income / current_share_price
+                    current_shares += reinvested_shares
+
+            # 5. Annual contribution buys shares at this year's price
+            if annual_contribution and current_share_price > 0:
+                current_shares += annual_contribution / current_share_price
+
+            # 6. Calculate Yields for this year (real yields depend on inflation and are derived when reporting)
+            nominal_yield_this_year = calculate_dividend_yield(current_payout_per_share, current_share_price, yield_type="indicated")
+
+            # Store unrounded checkpoints; rounding happens in build_projection_results
+            trace['shares_owned'].append(current_shares)
+            trace['share_price'].append(current_share_price)
+            trace['annual_dividend_per_share'].append(current_payout_per_share)
+            trace['annual_gross_income'].append(annual_gross_income)
+            trace['annual_after_tax_income'].append(annual_after_tax_income)
+            trace['cumulative_gross_income'].append(cumulative_gross)
+            trace['cumulative_after_tax_income'].append(cumulative_after_tax)
+            trace['nominal_yield_over_time'].append(nominal_yield_this_year)
+    tax_span.record()
+
+    trace['current_shares'] = current_shares
+    trace['current_share_price'] = current_share_price
+    trace['current_payout_per_share'] = current_payout_per_share
+    trace['cumulative_gross'] = cumulative_gross
+    trace['cumulative_after_tax'] = cumulative_after_tax
+    return trace
+
+
+class ProjectionSeries(collections.abc.Mapping):
+    """
+    Read-only projected_data backed by one float64 NumPy column per series,
+    kept at full precision. Indexing by key returns the rounded Python list
+    (shares to 4 decimals, money and yields to 2, N/A real yields as None),
+    computed once per key, so templates, CSV/PDF rows and JSON all see the
+    same values the dict-of-lists used to hold.
+    """
+    __slots__ = ('_length', '_columns', '_rounded')
+
+    def __init__(self, columns, length):
+        self._length = length
+        self._columns = {key: np.asarray(columns[key], dtype=float) for key in BATCH_SERIES_KEYS}
+        self._rounded = {}
+
+    def column(self, key):
+        """Full-precision values of one series (years as int64)."""
+        if key == 'years':
+            return np.arange(1, self._length + 1, dtype=np.int64)
+        return self._columns[key]
+
+    def __getitem__(self, key):
+        rounded = self._rounded.get(key)
+        if rounded is None:
+            if key == 'years':
+                rounded = list(range(1, self._length + 1))
+            else:
+                digits = 4 if key == 'shares_owned' else 2
+                values = self._columns[key].tolist()
+                if key == 'real_yield_over_time':
+                    rounded = [None if math.isnan(v) else round(v, digits) for v in values]
+                else:
+                    rounded = [round(v, digits) for v in values]
+            self._rounded[key] = rounded
+        return rounded
+
+    def __iter__(self):
+        yield 'years'
+        yield from BATCH_SERIES_KEYS
+
+    def __len__(self):
+        return len(BATCH_SERIES_KEYS) + 1
+
+    def __getstate__(self):
+        # Rounded lists are rebuilt on demand, so caches only store the columns
+        return self._length, self._columns
+
+    def __setstate__(self, state):
+        self._length, self._columns = state
+        self._rounded = {}
+
+    def to_blob(self):
+        """Compact binary form: the series as one zlib-compressed little-endian float64 block."""
+        stacked = np.stack([self._columns[key] for key in BATCH_SERIES_KEYS])
+        return zlib.compress(stacked.astype('<f8').tobytes())
+
+    @classmethod
+    def from_blob(cls, blob, length):
+        """Rebuilds a ProjectionSeries of `length` years from to_blob() output."""
+        stacked = np.frombuffer(zlib.decompress(blob), dtype='<f8').reshape(len(BATCH_SERIES_KEYS), length)
+        return cls(dict(zip(BATCH_SERIES_KEYS, stacked)), length)
+
+    def to_dict(self):
+        """Plain dict of rounded lists, the JSON shape the template and API expect."""
+        return {key: self[key] for key in self}
+
+
+def json_default(value):
+    """json.dumps fallback that serializes ProjectionSeries as its rounded dict."""
+    if isinstance(value, ProjectionSeries):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def replace_non_finite(value):
+    """Copy of a JSON-ready value with NaN and infinite floats replaced by None."""
+    if isinstance(value, ProjectionSeries):
+        value = value.to_dict()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [replace_non_finite(item) for item in value]
+    return value
+
+
+def dumps_strict_json(value):
+    """
+    json.dumps for NDJSON lines: strict JSON has no NaN/Infinity tokens, so
+    overflowing results are written with null in place of non-finite values.
+    """
+    try:
+        return json.dumps(value, default=json_default, allow_nan=False)
+    except ValueError:
+        return json.dumps(replace_non_finite(value), default=json_default, allow_nan=False)
+
+
+class ProjectionJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (jsonify, |tojson) that understands ProjectionSeries."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ProjectionSeries):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+app.json = ProjectionJSONProvider(app)
+
+
+def build_projection_results(inputs, trace):
+    """
+    Builds the results dict for inputs['time_horizon'] years from a trace that
+    covers at least that many. Only reporting work happens here (real yields
+    for the given inflation rate, rounding, summary values), so changing the
+    inflation rate or shortening the horizon never reruns the DRIP/tax loop.
+    """
+    initial_shares = inputs['initial_shares']
+    initial_share_price = inputs['initial_share_price']
+    current_annual_dividend_per_share = inputs['current_annual_dividend_per_share']
+    time_horizon = max(inputs['time_horizon'], 0)
+    inflation_rate_pct = inputs['inflation_rate_pct']
+
     # Initial Calculations
     nominal_yield_pct = calculate_dividend_yield(
         current_annual_dividend_per_share, initial_share_price, 
-        yield_type=selected_yield_type, frequency=payout_frequency_num
+        yield_type=inputs['selected_yield_type'], frequency=inputs['payout_frequency_num']
     )
     # Pass inflation rate as a decimal to calculate_real_yield
     real_yield_pct = calculate_real_yield(nominal_yield_pct, inflation_rate_pct / 100)
     
     # Sustainability Alerts
     sustainability_alerts = assess_sustainability_risks(
-        payout_ratio, debt_to_equity, free_cash_flow, eps, current_annual_dividend_per_share
+        inputs['payout_ratio'], inputs['debt_to_equity'], inputs['free_cash_flow'], inputs['eps'],
+        current_annual_dividend_per_share
     )
 
     # --- Projections Over Time ---
-    projected_data = {
-        'years': [],
-        'shares_owned': [],
-        'share_price': [],
-        'annual_dividend_per_share': [],
-        'annual_gross_income': [],
-        'annual_after_tax_income': [],  # This will now be truly after-tax
-        'cumulative_gross_income': [],
-        'cumulative_after_tax_income': [],  # This will now be truly after-tax
-        'nominal_yield_over_time': [],
-        'real_yield_over_time': []  # This already uses inflation_rate_pct
-    }
-
-    current_shares = initial_shares
-    current_share_price = initial_share_price
-    current_payout_per_share = current_annual_dividend_per_share  # This is the base for growth
-    
-    cumulative_gross = 0  # Initialize Total Cumulative Gross Dividend Income
-    cumulative_after_tax = 0
-
-    for year in range(1, time_horizon + 1):
-        # 1. Project Dividend Payout (payout-focused growth)
-        if year > 1:  # Apply growth from year 2 onwards
-            current_payout_per_share *= (1 + (dividend_growth_rate_pct / 100))
-        
-        # 2. Project Share Price
-        if year > 1:  # Apply growth from year 2 onwards
-            current_share_price *= (1 + (share_price_growth_rate_pct / 100))
-
-        # 3. Calculate Annual Gross Dividend Income for the current year
-        # Formula: Annual Gross Income (Current Year) = Current Shares Owned * Current Annual Dividend Per Share
-        annual_gross_income = current_shares * current_payout_per_share
-        
-        # Apply progressive tax to get Annual After-Tax Income
-        annual_after_tax_income = calculate_after_tax_income(
-            annual_gross_income, parsed_tax_slabs, tax_exemption_threshold
-        )
+    nominal_yields = trace['nominal_yield_over_time'][:time_horizon]
+    real_yields = [calculate_real_yield(nominal_yield, inflation_rate_pct / 100) for nominal_yield in nominal_yields]
+    columns = {key: trace[key][:time_horizon] for key in TRACE_SERIES_KEYS}
+    columns['real_yield_over_time'] = [math.nan if v is None else v for v in real_yields]
+    projected_data = ProjectionSeries(columns, time_horizon)
+
+    if time_horizon:
+        current_shares = trace['shares_owned'][time_horizon - 1]
+        current_share_price = trace['share_price'][time_horizon - 1]
+        cumulative_gross = trace['cumulative_gross_income'][time_horizon - 1]
+        cumulative_after_tax = trace['cumulative_after_tax_income'][time_horizon - 1]
+    else:
+        current_shares = initial_shares
+        current_share_price = initial_share_price
+        cumulative_gross = 0
+        cumulative_after_tax = 0
 
-        # Accumulate Total Cumulative Gross Dividend Income
-        # Formula: Cumulative Gross (Current Year) = Cumulative Gross (Previous Year) + Annual Gross Income (Current Year)
-        cumulative_gross += annual_gross_income
-        
-        # Accumulate Total Cumulative After-Tax Dividend Income
-        cumulative_after_tax += annual_after_tax_income
-
-        # 4. DRIP Modeling (reinvest after-tax dividends)
-        if drip_enabled and current_share_price > 0:  # Only if DRIP is on and price is positive
-            reinvested_shares = annual_after_tax_income / current_share_price
-            current_shares += reinvested_shares
-
-        # 5. Calculate Yields for this year
-        nominal_yield_this_year = calculate_dividend_yield(current_payout_per_share, current_share_price, yield_type="indicated")
-        # Pass inflation rate as a decimal to calculate_real_yield
-        real_yield_this_year = calculate_real_yield(nominal_yield_this_year, inflation_rate_pct / 100)
-
-        # Store data for output/charting
-        projected_data['years'].append(year)
-        projected_data['shares_owned'].append(round(current_shares, 4))
-        projected_data['share_price'].append(round(current_share_price, 2))
-        projected_data['annual_dividend_per_share'].append(round(current_payout_per_share, 2))
-        projected_data['annual_gross_income'].append(round(annual_gross_income, 2))
-        projected_data['annual_after_tax_income'].append(round(annual_after_tax_income, 2))
-        projected_data['cumulative_gross_income'].append(round(cumulative_gross, 2))
-        projected_data['cumulative_after_tax_income'].append(round(cumulative_after_tax, 2))
-        projected_data['nominal_yield_over_time'].append(round(nominal_yield_this_year, 2) if nominal_yield_this_year is not None else None)
-        projected_data['real_yield_over_time'].append(round(real_yield_this_year, 2) if real_yield_this_year is not None else None)
-    
     # Final total return calculation (dividends + capital gain)
     final_capital_value = current_shares * current_share_price
     # Initial capital value is initial_shares * initial_share_price
@@ -354,213 +833,2687 @@ def calculate_all_projections(form_data):
     }
 
 
-# --- Flask Routes ---
+def projection_checkpoint_key(inputs):
+    """
+    Hash of the inputs that drive the DRIP/tax loop. Inputs that only affect
+    reporting (see REPORTING_ONLY_INPUTS) are left out, so scenarios differing
+    only in those share one trace.
+    """
+    loop_inputs = {key: value for key, value in inputs.items() if key not in REPORTING_ONLY_INPUTS}
+    return projection_cache_key(loop_inputs)
 
-@app.route('/', methods=['GET', 'POST'])
-def index():
+
+def calculate_projections_incremental(inputs):
     """
-    Handles the main application route, processes form submissions,
-    and renders the dividend projection results.
+    Same results as calculate_projections_from_inputs, reusing the stored
+    trace of an earlier run with the same loop inputs: a longer time horizon
+    resumes from its last checkpoint, while a shorter one or a different
+    inflation rate is served from the existing checkpoints.
     """
-    results = None
-    error_message = None
+    key = projection_checkpoint_key(inputs)
+    trace = projection_checkpoints.get(key)
+    if trace is _CACHE_MISS:
+        trace = new_projection_trace(inputs)
+    if len(trace['shares_owned']) < inputs['time_horizon']:
+        # Extend a copy so concurrent readers of the stored trace are unaffected
+        trace = {key_: (value.copy() if isinstance(value, list) else value) for key_, value in trace.items()}
+        extend_projection_trace(inputs, trace, inputs['time_horizon'])
+        projection_checkpoints.set(key, trace)
+    return build_projection_results(inputs, trace)
 
-    if request.method == 'POST':
-        form_data = request.form.to_dict()
 
-        # Basic input validation for critical fields
-        # Check for presence and valid numeric conversion
-        required_float_fields = ['initial_shares', 'current_price', 'inflation_rate']
-        for field in required_float_fields:
-            if not form_data.get(field) or parse_float(form_data.get(field), -1) < 0:
-                error_message = f"Please enter a valid positive number for {field.replace('_', ' ').title()}."
-                return render_template('index.html', results=results, error=error_message)
-        
-        # Specific dividend input validation based on yield type
-        selected_yield_type = form_data.get('yield_type', 'indicated')
-        dividend_input_present = False
-        if selected_yield_type == 'indicated' and parse_float(form_data.get('annual_dividend_indicated'), -1) >= 0:
-            dividend_input_present = True
-        elif selected_yield_type == 'trailing' and parse_float(form_data.get('ttm_dividend'), -1) >= 0:
-            dividend_input_present = True
-        elif selected_yield_type == 'forward' and parse_float(form_data.get('next_expected_dividend'), -1) >= 0:
-            dividend_input_present = True
-        
-        if not dividend_input_present:
-            error_message = "Please enter a valid non-negative dividend amount for the selected yield type."
-            return render_template('index.html', results=results, error=error_message)
+# --- Batch Projection Engine ---
 
-        # Time horizon validation
-        time_horizon = parse_int(form_data.get('time_horizon'), 0)
-        if time_horizon <= 0:
-            error_message = "Time Horizon must be a positive integer."
-            return render_template('index.html', results=results, error=error_message)
-        
-        try:
-            results = calculate_all_projections(form_data)
-        except Exception as e:
-            error_message = f"An unexpected error occurred during calculation: {e}"
-            app.logger.error(f"Error during projection calculation: {e}", exc_info=True)
+def build_scenario_columns(parsed_inputs_list):
+    """
+    Converts a list of parse_projection_inputs() dicts into the columnar arrays
+    consumed by calculate_batch_projections.
+    """
+    def column(key, dtype=float):
+        return np.array([inputs[key] for inputs in parsed_inputs_list], dtype=dtype)
+
+    return {
+        'initial_shares': column('initial_shares'),
+        'current_price': column('initial_share_price'),
+        'annual_dividend': column('current_annual_dividend_per_share'),
+        'dividend_growth_rate': column('dividend_growth_rate_pct'),
+        'share_price_growth_rate': column('share_price_growth_rate_pct'),
+        'time_horizon': column('time_horizon', dtype=np.int64),
+        'drip_enabled': column('drip_enabled', dtype=bool),
+        'drip_per_payout': column('drip_per_payout', dtype=bool),
+        'payout_frequency': column('payout_frequency_num', dtype=np.int64),
+        'tax_exemption_threshold': column('tax_exemption_threshold'),
+        'inflation_rate': column('inflation_rate_pct'),
+        'annual_contribution': column('annual_contribution'),
+    }
 
-    return render_template('index.html',
-                           results=results,
-                           error=error_message)
 
-@app.route('/download_csv', methods=['POST'])
-def download_csv():
+def step_payout_periods(current_shares, current_payout_per_share, current_share_price, payout_frequency, per_payout):
     """
-    Generates and serves a CSV file containing the dividend projection data.
+    Advances one year of dividend payments for arrays of scenarios. Where
+    per_payout is set, each of the year's payout_frequency payments is
+    reinvested at the current price before the next one is paid, stepping
+    all scenarios together one payment period at a time; elsewhere the
+    closed form shares x annual dividend applies and shares are unchanged.
+    Returns (annual_gross_income, shares_after_reinvestment).
     """
-    form_data = request.form.to_dict()
-    try:
-        results = calculate_all_projections(form_data)
-        projected_data = results['projected_data']
-
-        si = io.StringIO()
-        cw = csv.writer(si)
-
-        # CSV Header
-        headers = [
-            "Year", "Shares Owned", "Share Price ($)", "Dividend/Share ($)",
-            "Annual Gross Income ($)", "Annual After-Tax Income ($)",
-            "Cumulative Gross Income ($)", "Cumulative After-Tax Income ($)",
-            "Nominal Yield (%)", "Real Yield (%)"
-        ]
-        cw.writerow(headers)
-
-        # CSV Rows
-        for i in range(len(projected_data['years'])):
-            row = [
-                projected_data['years'][i],
-                f"{projected_data['shares_owned'][i]:.4f}",
-                f"{projected_data['share_price'][i]:.2f}",
-                f"{projected_data['annual_dividend_per_share'][i]:.2f}",
-                f"{projected_data['annual_gross_income'][i]:.2f}",
-                f"{projected_data['annual_after_tax_income'][i]:.2f}",
-                f"{projected_data['cumulative_gross_income'][i]:.2f}",
-                f"{projected_data['cumulative_after_tax_income'][i]:.2f}",
-                f"{projected_data['nominal_yield_over_time'][i]:.2f}" if projected_data['nominal_yield_over_time'][i] is not None else "N/A",
-                f"{projected_data['real_yield_over_time'][i]:.2f}" if projected_data['real_yield_over_time'][i] is not None else "N/A"
-            ]
-            cw.writerow(row)
-        
-        output = si.getvalue().encode('utf-8')
-        response = make_response(output)
-        response.headers["Content-Disposition"] = "attachment; filename=dividend_projections.csv"
-        response.headers["Content-type"] = "text/csv"
-        return response
+    annual_gross_income = current_shares * current_payout_per_share
+    if not per_payout.any():
+        return annual_gross_income, current_shares
 
-    except Exception as e:
-        app.logger.error(f"Error generating CSV: {e}", exc_info=True)
-        return "Error generating CSV file.", 500
+    period_gross_income = np.zeros_like(annual_gross_income)
+    period_shares = current_shares.copy()
+    payment_per_share = current_payout_per_share / payout_frequency
+    for period in range(int(payout_frequency[per_payout].max())):
+        paying = per_payout & (period < payout_frequency)
+        payment = period_shares * payment_per_share
+        period_gross_income = np.where(paying, period_gross_income + payment, period_gross_income)
+        period_shares = np.where(paying, period_shares + payment / current_share_price, period_shares)
 
+    return (np.where(per_payout, period_gross_income, annual_gross_income),
+            np.where(per_payout, period_shares, current_shares))
 
-@app.route('/download_pdf', methods=['POST'])
-def download_pdf():
+
+def allocate_pooled_after_tax_income(tax_schedule, annual_gross_income, exemption_threshold):
     """
-    Generates a PDF document with a dividend projection report using ReportLab's
-    SimpleDocTemplate and Table objects for structured content.
+    Applies the progressive tax once to the summed gross income of all
+    holdings and allocates the after-tax total back to each holding in
+    proportion to its gross income. Returns per-holding after-tax income.
     """
-    form_data = request.form.to_dict()
+    total_gross_income = float(annual_gross_income.sum())
+    if total_gross_income <= 0:
+        return annual_gross_income.copy()
+    total_after_tax_income = tax_schedule.after_tax_income(total_gross_income, float(exemption_threshold[0]))
+    return annual_gross_income * (total_after_tax_income / total_gross_income)
+
+
+def calculate_batch_projections(scenarios, tax_schedule=None, pooled_tax=False, final_values_only=False):
+    """
+    Projects many scenarios at once with NumPy array operations.
+
+    `scenarios` is a dict of equal-length columns keyed like the form fields
+    (see build_scenario_columns); every scenario shares `tax_schedule` (a
+    TaxSchedule or a list of tax slabs, defaulting to DEFAULT_TAX_SLABS). Each
+    projected series comes back as a (scenarios x years) array holding
+    unrounded values, with NaN past a scenario's own time horizon. Use
+    batch_projected_data() to get a scenario's projected_data dict, which is
+    identical to what calculate_all_projections produces.
+
+    With pooled_tax=True the scenarios are holdings of one portfolio: each
+    year their gross income is taxed once as a total (using the first
+    scenario's exemption threshold) and the after-tax amount is split back
+    pro-rata, see allocate_pooled_after_tax_income.
+
+    With final_values_only=True no per-year series are kept ('projected' is
+    None), so memory stays proportional to the number of scenarios when only
+    the end-of-horizon values are needed.
+    """
+    tax_schedule = compile_tax_schedule(DEFAULT_TAX_SLABS if tax_schedule is None else tax_schedule)
+
+    current_shares = np.array(scenarios['initial_shares'], dtype=float)
+    current_share_price = np.array(scenarios['current_price'], dtype=float)
+    current_payout_per_share = np.array(scenarios['annual_dividend'], dtype=float)
+    dividend_growth = 1 + (np.asarray(scenarios['dividend_growth_rate'], dtype=float) / 100)
+    share_price_growth = 1 + (np.asarray(scenarios['share_price_growth_rate'], dtype=float) / 100)
+    time_horizons = np.asarray(scenarios['time_horizon'], dtype=np.int64)
+    drip_enabled = np.asarray(scenarios['drip_enabled'], dtype=bool)
+
+    scenario_count = current_shares.shape[0]
+    drip_per_payout = drip_enabled & np.broadcast_to(
+        np.asarray(scenarios.get('drip_per_payout', False), dtype=bool), (scenario_count,))
+    payout_frequency = np.maximum(np.broadcast_to(
+        np.asarray(scenarios.get('payout_frequency', 1), dtype=np.int64), (scenario_count,)), 1)
+    exemption_threshold = np.broadcast_to(
+        np.asarray(scenarios.get('tax_exemption_threshold', 0.0), dtype=float), (scenario_count,))
+    inflation_rate = np.broadcast_to(
+        np.asarray(scenarios.get('inflation_rate', 0.0), dtype=float) / 100, (scenario_count,))
+    annual_contribution = np.broadcast_to(
+        np.asarray(scenarios.get('annual_contribution', 0.0), dtype=float), (scenario_count,))
+
+    max_horizon = max(int(time_horizons.max()), 0) if scenario_count else 0
+    grid_shape = (scenario_count, max_horizon)
+    projected = None if final_values_only else {key: np.full(grid_shape, np.nan) for key in BATCH_SERIES_KEYS}
+
+    cumulative_gross = np.zeros(scenario_count)
+    cumulative_after_tax = np.zeros(scenario_count)
+    final_shares = current_shares.copy()
+    final_share_price = current_share_price.copy()
+    final_cumulative_gross = np.zeros(scenario_count)
+    final_cumulative_after_tax = np.zeros(scenario_count)
+    final_annual_after_tax = np.zeros(scenario_count)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'), timed_span('batch_projection'):
+        for year in range(1, max_horizon + 1):
+            col = year - 1
+            if year > 1:  # Apply growth from year 2 onwards
+                current_payout_per_share *= dividend_growth
+                current_share_price *= share_price_growth
+
+            reinvest = drip_enabled & (current_share_price > 0)
+            per_payout = reinvest & drip_per_payout
+            annual_gross_income, current_shares = step_payout_periods(
+                current_shares, current_payout_per_share, current_share_price, payout_frequency, per_payout
+            )
+            if pooled_tax:
+                annual_after_tax_income = allocate_pooled_after_tax_income(tax_schedule, annual_gross_income, exemption_threshold)
+            else:
+                annual_after_tax_income = tax_schedule.after_tax_income_array(annual_gross_income, exemption_threshold)
+            cumulative_gross += annual_gross_income
+            cumulative_after_tax += annual_after_tax_income
+
+            # DRIP Modeling (reinvest after-tax dividends where DRIP is on and price is positive;
+            # per-payout scenarios already reinvested gross and sell shares to cover the tax)
+            current_shares = np.where(
+                per_payout, current_shares - (annual_gross_income - annual_after_tax_income) / current_share_price,
+                np.where(reinvest, current_shares + annual_after_tax_income / current_share_price, current_shares)
+            )
+            # Annual contributions buy shares at this year's price
+            current_shares = np.where((annual_contribution != 0) & (current_share_price > 0),
+                                      current_shares + annual_contribution / current_share_price, current_shares)
+
+            if projected is not None:
+                # Same guards as calculate_dividend_yield / calculate_real_yield
+                nominal_yield = np.where((current_payout_per_share < 0) | (current_share_price <= 0), 0.0,
+                                         (current_payout_per_share / current_share_price) * 100)
+                real_yield = np.where(inflation_rate <= -1, np.nan,
+                                      (((1 + nominal_yield / 100) / (1 + inflation_rate)) - 1) * 100)
+
+                active = year <= time_horizons
+                projected['shares_owned'][:, col] = np.where(active, current_shares, np.nan)
+                projected['share_price'][:, col] = np.where(active, current_share_price, np.nan)
+                projected['annual_dividend_per_share'][:, col] = np.where(active, current_payout_per_share, np.nan)
+                projected['annual_gross_income'][:, col] = np.where(active, annual_gross_income, np.nan)
+                projected['annual_after_tax_income'][:, col] = np.where(active, annual_after_tax_income, np.nan)
+                projected['cumulative_gross_income'][:, col] = np.where(active, cumulative_gross, np.nan)
+                projected['cumulative_after_tax_income'][:, col] = np.where(active, cumulative_after_tax, np.nan)
+                projected['nominal_yield_over_time'][:, col] = np.where(active, nominal_yield, np.nan)
+                projected['real_yield_over_time'][:, col] = np.where(active, real_yield, np.nan)
+
+            # Capture end-of-horizon state for scenarios finishing this year
+            finished = year == time_horizons
+            final_shares = np.where(finished, current_shares, final_shares)
+            final_share_price = np.where(finished, current_share_price, final_share_price)
+            final_cumulative_gross = np.where(finished, cumulative_gross, final_cumulative_gross)
+            final_cumulative_after_tax = np.where(finished, cumulative_after_tax, final_cumulative_after_tax)
+            final_annual_after_tax = np.where(finished, annual_after_tax_income, final_annual_after_tax)
+
+        total_return_value = final_shares * final_share_price + final_cumulative_after_tax
+
+    return {
+        'years': np.arange(1, max_horizon + 1),
+        'time_horizon': time_horizons,
+        'projected': projected,
+        'final_shares': final_shares,
+        'final_share_price': final_share_price,
+        'total_cumulative_gross_income': final_cumulative_gross,
+        'total_cumulative_after_tax_income': final_cumulative_after_tax,
+        'total_return_value': total_return_value,
+        'final_annual_after_tax_income': final_annual_after_tax,
+    }
+
+
+def batch_projected_data(batch, index):
+    """
+    Returns the projected_data of one scenario of a batch as a
+    ProjectionSeries, rounded on access the same way calculate_all_projections
+    rounds it.
+    """
+    horizon = max(int(batch['time_horizon'][index]), 0)
+    projected = batch['projected']
+    # Copy the rows so a cached result does not keep the whole batch array alive
+    columns = {key: projected[key][index, :horizon].copy() for key in BATCH_SERIES_KEYS}
+    return ProjectionSeries(columns, horizon)
+
+
+def batch_results(inputs, batch, index):
+    """
+    The results dict calculate_all_projections returns, for scenario `index`
+    of a batch whose parsed inputs are `inputs`.
+    """
+    nominal_yield_pct = calculate_dividend_yield(
+        inputs['current_annual_dividend_per_share'], inputs['initial_share_price'],
+        yield_type=inputs['selected_yield_type'], frequency=inputs['payout_frequency_num']
+    )
+    return {
+        'initial_shares': inputs['initial_shares'],
+        'current_price': inputs['initial_share_price'],
+        'initial_nominal_yield': nominal_yield_pct,
+        'initial_real_yield': calculate_real_yield(nominal_yield_pct, inputs['inflation_rate_pct'] / 100),
+        'sustainability_alerts': assess_sustainability_risks(
+            inputs['payout_ratio'], inputs['debt_to_equity'], inputs['free_cash_flow'], inputs['eps'],
+            inputs['current_annual_dividend_per_share']
+        ),
+        'projected_data': batch_projected_data(batch, index),
+        'final_shares': round(float(batch['final_shares'][index]), 4),
+        'final_share_price': round(float(batch['final_share_price'][index]), 2),
+        'total_cumulative_gross_income': round(float(batch['total_cumulative_gross_income'][index]), 2),
+        'total_cumulative_after_tax_income': round(float(batch['total_cumulative_after_tax_income'][index]), 2),
+        'total_return_value': round(float(batch['total_return_value'][index]), 2),
+    }
+
+
+def calculate_all_projections_batch(form_data_list):
+    """
+    Batch counterpart of calculate_all_projections: returns one results dict
+    per form, in order, computed through calculate_batch_projections.
+    Scenarios are grouped by their compiled tax schedule so each group runs as
+    a single vectorized pass, and by horizon (in power-of-two bands) so one
+    long scenario does not widen the year arrays of every other one.
+    """
+    parsed_inputs_list = [parse_projection_inputs(form_data) for form_data in form_data_list]
+
+    groups = {}
+    for position, inputs in enumerate(parsed_inputs_list):
+        horizon_band = max(inputs['time_horizon'], 0).bit_length()
+        groups.setdefault((inputs['tax_schedule'].key, horizon_band), []).append(position)
+
+    results = [None] * len(parsed_inputs_list)
+    for positions in groups.values():
+        group_inputs = [parsed_inputs_list[position] for position in positions]
+        batch = calculate_batch_projections(
+            build_scenario_columns(group_inputs), group_inputs[0]['tax_schedule']
+        )
+        for index, position in enumerate(positions):
+            results[position] = batch_results(parsed_inputs_list[position], batch, index)
+    return results
+
+
+# --- Multi-core Execution ---
+
+# Worker processes used for large scenario sweeps (PROJECTION_WORKERS, defaults to the CPU count),
+# the number of scenarios sent to a worker at a time, and the batch size below which
+# sweeps stay in-process.
+PROJECTION_WORKERS = parse_int(os.environ.get('PROJECTION_WORKERS'), os.cpu_count() or 1)
+PROCESS_POOL_CHUNK_SIZE = parse_int(os.environ.get('PROCESS_POOL_CHUNK_SIZE'), 2000)
+PROCESS_POOL_MIN_BATCH = parse_int(os.environ.get('PROCESS_POOL_MIN_BATCH'), 5000)
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    Returns the shared ProcessPoolExecutor, creating it on first use with
+    PROJECTION_WORKERS processes (defaults to the CPU count).
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=PROJECTION_WORKERS)
+        return _process_pool
+
+
+def calculate_all_projections_parallel(form_data_list):
+    """calculate_all_projections_batch sharded across the process pool; returns results in input order."""
+    return [results for _, results in run_projection_batch_parallel(form_data_list)]
+
+
+def run_projection_batch_parallel(form_data_list, chunk_size=PROCESS_POOL_CHUNK_SIZE, ordered=True,
+                                  chunk_timeout=None, min_parallel_batch=PROCESS_POOL_MIN_BATCH, executor=None):
+    """
+    Runs calculate_all_projections_batch over a list of forms sharded across
+    the process pool, yielding (index, results) pairs.
+
+    Forms are sent in chunks of chunk_size. With ordered=True results come back
+    in input order; otherwise each chunk is yielded as soon as it finishes.
+    A chunk taking longer than chunk_timeout seconds raises TimeoutError and
+    cancels every chunk that has not started yet, as does closing the
+    generator early. Batches smaller than min_parallel_batch run in-process,
+    where fork and pickling overhead would cost more than the extra cores save.
+    """
+    form_data_list = list(form_data_list)
+    if len(form_data_list) < min_parallel_batch:
+        for chunk_start in range(0, len(form_data_list), chunk_size):
+            chunk = form_data_list[chunk_start:chunk_start + chunk_size]
+            for offset, results in enumerate(calculate_all_projections_batch(chunk)):
+                yield chunk_start + offset, results
+        return
+
+    executor = executor if executor is not None else get_process_pool()
+    futures = {}
+    for chunk_start in range(0, len(form_data_list), chunk_size):
+        future = executor.submit(calculate_all_projections_batch, form_data_list[chunk_start:chunk_start + chunk_size])
+        futures[future] = chunk_start
+
     try:
-        results = calculate_all_projections(form_data)
-        projected_data = results['projected_data']
+        if ordered:
+            for future, chunk_start in futures.items():
+                for offset, results in enumerate(future.result(timeout=chunk_timeout)):
+                    yield chunk_start + offset, results
+        else:
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=chunk_timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                if not done:
+                    raise TimeoutError(f"No projection chunk finished within {chunk_timeout} seconds.")
+                for future in done:
+                    chunk_start = futures[future]
+                    for offset, results in enumerate(future.result()):
+                        yield chunk_start + offset, results
+    finally:
+        # Cancel whatever has not started yet (timeout, error or early close)
+        for future in futures:
+            future.cancel()
+
+
+# --- Monte Carlo Simulation ---
+
+# Paths advanced together per chunk, the most paths x years cells one chunk
+# may hold, and the largest grid whose percentiles are taken exactly; bigger
+# runs are summarized through histograms.
+MONTE_CARLO_CHUNK_SIZE = 50000
+MONTE_CARLO_CHUNK_CELLS = 5000000
+MONTE_CARLO_EXACT_CELLS = 5000000
+MONTE_CARLO_HISTOGRAM_BINS = 4096
+MONTE_CARLO_MAX_PATHS = 1000000
+MONTE_CARLO_MAX_YEARS = 200
+MONTE_CARLO_SERIES_KEYS = ('annual_after_tax_income', 'shares_owned', 'total_return_value')
+
+
+def draw_growth_rates(rng, spec, size):
+    """
+    Draws `size` yearly growth rates (as decimals) from a distribution spec:
+    {'distribution': 'normal', 'mean': 5, 'std': 2}, 'lognormal' (mean/std of
+    the log growth factor, in %), 'uniform' ('low'/'high') or 'fixed' ('mean').
+    All values are in percent. Rates are floored at -100% so prices and
+    payouts never turn negative.
+    """
+    distribution = spec.get('distribution', 'normal')
+    mean = parse_float(spec.get('mean')) / 100
+    std = parse_float(spec.get('std')) / 100
+    if distribution == 'normal':
+        rates = rng.normal(mean, std, size)
+    elif distribution == 'lognormal':
+        rates = np.exp(rng.normal(math.log1p(max(mean, -0.99)), std, size)) - 1
+    elif distribution == 'uniform':
+        rates = rng.uniform(parse_float(spec.get('low')) / 100, parse_float(spec.get('high')) / 100, size)
+    elif distribution == 'fixed':
+        rates = np.full(size, mean)
+    else:
+        raise ValueError(f"Unknown growth distribution '{distribution}'.")
+    return np.maximum(rates, -1.0)
 
-        buffer = io.BytesIO()  # Use io.BytesIO directly
 
-        # Define custom page size (16 inches width x 10 inches height)
-        custom_width = 16 * inch
-        custom_height = 10 * inch
+def _simulate_monte_carlo_chunk(inputs, path_count, dividend_growth, share_price_growth, rng):
+    """
+    Advances path_count paths year by year and returns a (paths x years)
+    array per MONTE_CARLO_SERIES_KEYS entry. Follows the same yearly steps as
+    calculate_all_projections, with growth drawn per path and year.
+    """
+    time_horizon = inputs['time_horizon']
+    tax_schedule = inputs['tax_schedule']
+    tax_exemption_threshold = inputs['tax_exemption_threshold']
+
+    current_shares = np.full(path_count, inputs['initial_shares'], dtype=float)
+    current_share_price = np.full(path_count, inputs['initial_share_price'], dtype=float)
+    current_payout_per_share = np.full(path_count, inputs['current_annual_dividend_per_share'], dtype=float)
+    cumulative_after_tax = np.zeros(path_count)
+    payout_frequency = np.full(path_count, max(inputs['payout_frequency_num'], 1), dtype=np.int64)
+    series = {key: np.empty((path_count, time_horizon)) for key in MONTE_CARLO_SERIES_KEYS}
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for year in range(1, time_horizon + 1):
+            if year > 1:  # Apply growth from year 2 onwards
+                current_payout_per_share *= 1 + draw_growth_rates(rng, dividend_growth, path_count)
+                current_share_price *= 1 + draw_growth_rates(rng, share_price_growth, path_count)
+
+            reinvest = inputs['drip_enabled'] & (current_share_price > 0)
+            per_payout = reinvest & inputs['drip_per_payout']
+            annual_gross_income, current_shares = step_payout_periods(
+                current_shares, current_payout_per_share, current_share_price, payout_frequency, per_payout
+            )
+            annual_after_tax_income = tax_schedule.after_tax_income_array(annual_gross_income, tax_exemption_threshold)
+            cumulative_after_tax += annual_after_tax_income
+
+            current_shares = np.where(
+                per_payout, current_shares - (annual_gross_income - annual_after_tax_income) / current_share_price,
+                np.where(reinvest, current_shares + annual_after_tax_income / current_share_price, current_shares)
+            )
+            if inputs['annual_contribution']:
+                current_shares = np.where(current_share_price > 0,
+                                          current_shares + inputs['annual_contribution'] / current_share_price, current_shares)
+
+            series['annual_after_tax_income'][:, year - 1] = annual_after_tax_income
+            series['shares_owned'][:, year - 1] = current_shares
+            series['total_return_value'][:, year - 1] = current_shares * current_share_price + cumulative_after_tax
+    return series
+
+
+def _histogram_percentiles(counts, edges, percentiles):
+    """Interpolated percentiles of one year's histogram."""
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    values = []
+    for percentile in percentiles:
+        target = percentile / 100 * total
+        bin_index = min(int(np.searchsorted(cumulative, target, side='left')), len(counts) - 1)
+        below = cumulative[bin_index - 1] if bin_index > 0 else 0
+        fraction = (target - below) / counts[bin_index] if counts[bin_index] else 0.0
+        values.append(edges[bin_index] + fraction * (edges[bin_index + 1] - edges[bin_index]))
+    return values
+
+
+def simulate_monte_carlo_projections(inputs, n_paths=10000, dividend_growth=None, share_price_growth=None,
+                                     seed=None, percentiles=(5, 50, 95), chunk_size=MONTE_CARLO_CHUNK_SIZE):
+    """
+    Simulates n_paths stochastic projections of a scenario (parsed by
+    parse_projection_inputs) and returns percentile bands per year for
+    after-tax income, shares owned and total return value.
+
+    dividend_growth / share_price_growth are distribution specs for
+    draw_growth_rates; by default each is a fixed rate equal to the scenario's
+    deterministic growth rate. Paths are advanced in chunks of chunk_size,
+    each with its own child of a SeedSequence, so a given seed reproduces the
+    same bands. Chunks are shrunk so none holds more than
+    MONTE_CARLO_CHUNK_CELLS paths x years. Runs larger than
+    MONTE_CARLO_EXACT_CELLS take percentiles from per-year histograms built
+    over a second pass, keeping memory bounded by the chunk size; the bin
+    width bounds their error.
+    """
+    if dividend_growth is None:
+        dividend_growth = {'distribution': 'fixed', 'mean': inputs['dividend_growth_rate_pct']}
+    if share_price_growth is None:
+        share_price_growth = {'distribution': 'fixed', 'mean': inputs['share_price_growth_rate_pct']}
+
+    time_horizon = inputs['time_horizon']
+    chunk_size = max(1, min(chunk_size, MONTE_CARLO_CHUNK_CELLS // max(time_horizon, 1)))
+    seed_sequence = np.random.SeedSequence(seed)
+    chunk_sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+
+    def iter_chunks():
+        # Re-spawning from the same entropy replays identical chunks on every pass
+        child_seeds = np.random.SeedSequence(seed_sequence.entropy).spawn(len(chunk_sizes))
+        for path_count, child_seed in zip(chunk_sizes, child_seeds):
+            yield _simulate_monte_carlo_chunk(inputs, path_count, dividend_growth, share_price_growth,
+                                              np.random.default_rng(child_seed))
+
+    bands = {}
+    if n_paths * time_horizon <= MONTE_CARLO_EXACT_CELLS:
+        method = 'exact'
+        chunks = list(iter_chunks())
+        for key in MONTE_CARLO_SERIES_KEYS:
+            values = np.concatenate([chunk[key] for chunk in chunks])
+            bands[key] = np.percentile(values, percentiles, axis=0)
+    else:
+        method = 'histogram'
+        # First pass: per-year range of every series
+        lows = {key: np.full(time_horizon, np.inf) for key in MONTE_CARLO_SERIES_KEYS}
+        highs = {key: np.full(time_horizon, -np.inf) for key in MONTE_CARLO_SERIES_KEYS}
+        for chunk in iter_chunks():
+            for key in MONTE_CARLO_SERIES_KEYS:
+                lows[key] = np.minimum(lows[key], np.nanmin(chunk[key], axis=0))
+                highs[key] = np.maximum(highs[key], np.nanmax(chunk[key], axis=0))
+
+        # Second pass: per-year histograms over those ranges
+        edges = {}
+        counts = {}
+        for key in MONTE_CARLO_SERIES_KEYS:
+            edges[key] = np.empty((time_horizon, MONTE_CARLO_HISTOGRAM_BINS + 1))
+            for year_index in range(time_horizon):
+                low, high = lows[key][year_index], highs[key][year_index]
+                if low > 0 and high / low > 100:
+                    edges[key][year_index] = np.geomspace(low, high, MONTE_CARLO_HISTOGRAM_BINS + 1)
+                else:
+                    edges[key][year_index] = np.linspace(low, max(high, low + 1e-12), MONTE_CARLO_HISTOGRAM_BINS + 1)
+            counts[key] = np.zeros((time_horizon, MONTE_CARLO_HISTOGRAM_BINS), dtype=np.int64)
+        for chunk in iter_chunks():
+            for key in MONTE_CARLO_SERIES_KEYS:
+                for year_index in range(time_horizon):
+                    counts[key][year_index] += np.histogram(chunk[key][:, year_index], bins=edges[key][year_index])[0]
+
+        for key in MONTE_CARLO_SERIES_KEYS:
+            bands[key] = np.array([
+                _histogram_percentiles(counts[key][year_index], edges[key][year_index], percentiles)
+                for year_index in range(time_horizon)
+            ]).T
 
-        doc = SimpleDocTemplate(buffer, pagesize=(custom_width, custom_height),
-                                 rightMargin=30, leftMargin=30,
-                                 topMargin=30, bottomMargin=30)
-        
-        styles = getSampleStyleSheet()
-        story = []
-
-        title_style = styles['h1']
-        title_style.alignment = 1
-        title_style.fontSize = 14
-        title_style.fontName = "Helvetica-Bold"
-        story.append(Paragraph("Dividend Projection Report", title_style))
-        story.append(Spacer(1, 0.2 * inch))
-
-        headers = [
-            "Year", "Shares Owned", "Share Price($)", "Dividend/Share($)", "Annual Gross Income($)", "Annual After-Tax Income($)",
-            "Cumulative Gross Income($)", "Cumulative After-Tax Income($)", "Nominal Yield %", "Real Yield %"
-        ]
+    return {
+        'years': list(range(1, time_horizon + 1)),
+        'n_paths': n_paths,
+        'seed': seed_sequence.entropy,
+        'method': method,
+        'percentiles': {
+            key: {f"p{percentile:g}": [round(v, 4 if key == 'shares_owned' else 2) for v in bands[key][i].tolist()]
+                  for i, percentile in enumerate(percentiles)}
+            for key in MONTE_CARLO_SERIES_KEYS
+        },
+    }
 
-        table_data = [headers]
-
-        for i in range(len(projected_data['years'])):
-            row = [
-                projected_data['years'][i],
-                f"{projected_data['shares_owned'][i]:.4f}",
-                f"{projected_data['share_price'][i]:.2f}",
-                f"{projected_data['annual_dividend_per_share'][i]:.2f}",
-                f"{projected_data['annual_gross_income'][i]:.2f}",
-                f"{projected_data['annual_after_tax_income'][i]:.2f}",
-                f"{projected_data['cumulative_gross_income'][i]:.2f}",
-                f"{projected_data['cumulative_after_tax_income'][i]:.2f}",
-                f"{projected_data['nominal_yield_over_time'][i]:.2f}" if projected_data['nominal_yield_over_time'][i] is not None else "N/A",
-                f"{projected_data['real_yield_over_time'][i]:.2f}" if projected_data['real_yield_over_time'][i] is not None else "N/A"
-            ]
-            table_data.append(row)
-
-        available_width = custom_width - doc.leftMargin - doc.rightMargin
-        
-        col_widths = [
-            0.04 * available_width,   # Year
-            0.10 * available_width,   # Shares Owned
-            0.09 * available_width,   # Share Price($)
-            0.11 * available_width,   # Dividend/Share($)
-            0.12 * available_width,   # Annual Gross Income($)
-            0.13 * available_width,   # Annual After-Tax Income($)
-            0.13 * available_width,   # Cumulative Gross Income($)
-            0.14 * available_width,   # Cumulative After-Tax Income($)
-            0.07 * available_width,   # Nominal Yield (%)
-            0.07 * available_width    # Real Yield (%)
-        ]
 
-        table = Table(table_data, colWidths=col_widths)
-
-        table_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ])
-        table.setStyle(table_style)
-        
-        story.append(table)
-        doc.build(story)
+# --- Sensitivity Analysis ---
 
-        buffer.seek(0)
+# Form fields a sensitivity grid can sweep, mapped to their batch scenario column.
+# Tax bracket sets have no column: each set runs as its own vectorized batch.
+SENSITIVITY_AXES = {
+    'dividend_growth_rate': 'dividend_growth_rate',
+    'share_price_growth_rate': 'share_price_growth_rate',
+    'initial_shares': 'initial_shares',
+    'current_price': 'current_price',
+    'inflation_rate': 'inflation_rate',
+    'tax_exemption_threshold': 'tax_exemption_threshold',
+    'time_horizon': 'time_horizon',
+    'annual_contribution': 'annual_contribution',
+    'drip_toggle': 'drip_enabled',
+    'dividend_tax_brackets_input': None,
+}
+SENSITIVITY_MAX_CELLS = parse_int(os.environ.get('DIVIDEND_SENSITIVITY_MAX_CELLS'), 10000)
+# Bound on cells x longest horizon, i.e. the number of cell-years one grid steps through
+SENSITIVITY_MAX_CELL_YEARS = parse_int(os.environ.get('DIVIDEND_SENSITIVITY_MAX_CELL_YEARS'), 5000000)
 
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name="dividend_projections.pdf",
-            mimetype="application/pdf"
+
+def sensitivity_axis_form(form_data, field, value):
+    """form_data with one field replaced by a JSON axis value (False clears a checkbox)."""
+    axis_form = {key: item for key, item in form_data.items() if key != field}
+    axis_form.update(scenario_to_form_data({field: value}))
+    return axis_form
+
+
+def calculate_sensitivity_grid(form_data, row_field, row_values, column_field, column_values):
+    """
+    Evaluates a scenario over every combination of row_values x column_values
+    for two SENSITIVITY_AXES fields. All cells sharing a tax schedule run as
+    one calculate_batch_projections pass. Returns (rows x columns) float
+    arrays of total_return_value and final-year after-tax income, matching
+    what calculate_all_projections reports for each cell.
+    """
+    row_inputs = [parse_projection_inputs(sensitivity_axis_form(form_data, row_field, value)) for value in row_values]
+    column_inputs = [parse_projection_inputs(sensitivity_axis_form(form_data, column_field, value)) for value in column_values]
+    base_inputs = parse_projection_inputs(form_data)
+
+    shape = (len(row_inputs), len(column_inputs))
+    cell_count = shape[0] * shape[1]
+    scenarios = {key: np.repeat(values, cell_count) for key, values in build_scenario_columns([base_inputs]).items()}
+    schedules = [base_inputs['tax_schedule']] * cell_count
+    for field, axis_inputs, spread in ((row_field, row_inputs, lambda values: np.repeat(values, shape[1])),
+                                       (column_field, column_inputs, lambda values: np.tile(values, shape[0]))):
+        column = SENSITIVITY_AXES[field]
+        if column is None:
+            schedules = spread(np.array([inputs['tax_schedule'] for inputs in axis_inputs], dtype=object)).tolist()
+        else:
+            scenarios[column] = spread(build_scenario_columns(axis_inputs)[column])
+
+    groups = {}
+    for position, schedule in enumerate(schedules):
+        groups.setdefault(schedule.key, []).append(position)
+
+    total_return_value = np.empty(cell_count)
+    final_after_tax_income = np.empty(cell_count)
+    for positions in groups.values():
+        positions = np.asarray(positions)
+        batch = calculate_batch_projections(
+            {key: values[positions] for key, values in scenarios.items()}, schedules[positions[0]],
+            final_values_only=True
         )
+        total_return_value[positions] = batch['total_return_value']
+        final_after_tax_income[positions] = batch['final_annual_after_tax_income']
+    return {
+        'total_return_value': total_return_value.reshape(shape),
+        'final_after_tax_income': final_after_tax_income.reshape(shape),
+    }
 
-    except Exception as e:
-        app.logger.error(f"Error generating PDF: {e}", exc_info=True)
-        return "Error generating PDF file.", 500
+
+def sensitivity_matrix(values):
+    """A 2-D array as nested lists rounded to cents, with non-finite cells as None (valid JSON)."""
+    return [[round(v, 2) if math.isfinite(v) else None for v in row] for row in values.tolist()]
+
+
+# --- Goal Seek ---
+
+# Inputs the goal-seek solver can solve for: form field -> (parsed input key,
+# lower bound, first upper bracket guess, resolution of the answer).
+GOAL_SEEK_VARIABLES = {
+    'initial_shares': ('initial_shares', 0.0, 100.0, 0.0001),
+    'annual_contribution': ('annual_contribution', 0.0, 1000.0, 0.01),
+    'dividend_growth_rate': ('dividend_growth_rate_pct', -100.0, 10.0, 0.0001),
+}
+GOAL_SEEK_MAX_EXPANSIONS = 60
+GOAL_SEEK_MAX_ITERATIONS = 200
+
+
+def after_tax_income_in_year(inputs, year):
+    """Unrounded after-tax income of the given projection year, without building results."""
+    trace = new_projection_trace(inputs)
+    extend_projection_trace(inputs, trace, year)
+    return trace['annual_after_tax_income'][year - 1]
+
+
+def solve_goal_seek(inputs, solve_for, target_income, year=None, income_tolerance=0.005):
+    """
+    Finds the lowest value of solve_for (a GOAL_SEEK_VARIABLES field), to
+    within its resolution or income_tolerance, whose projection reaches
+    target_income after-tax income in `year` (default: the time horizon),
+    with every other input taken from inputs.
+
+    After-tax income never decreases as shares, contributions or dividend
+    growth increase, so the answer is bracketed by doubling an upper bound
+    until it reaches the target and then bisected. The search stops early
+    once a midpoint lands within income_tolerance of the target, or when
+    the bracket is narrower than the variable's resolution. The answer is
+    rounded up to that resolution so it always reaches the target. Raises
+    ValueError when no value up to the expansion limit does, or when year
+    is outside the time horizon.
+    """
+    input_key, lower, upper, resolution = GOAL_SEEK_VARIABLES[solve_for]
+    year = inputs['time_horizon'] if year is None else year
+    if not 0 < year <= inputs['time_horizon']:
+        raise ValueError("year must be between 1 and the time horizon.")
+
+    def income_at(value):
+        return after_tax_income_in_year(dict(inputs, **{input_key: value}), year)
+
+    evaluations = 1
+    if income_at(lower) >= target_income:
+        value = lower
+    else:
+        with np.errstate(over='ignore'):
+            # Grow the bracket until the upper end reaches the target
+            for _ in range(GOAL_SEEK_MAX_EXPANSIONS):
+                evaluations += 1
+                if income_at(upper) >= target_income:
+                    break
+                lower, upper = upper, upper * 2
+            else:
+                raise ValueError(f"No {solve_for} up to {upper:g} reaches the target after-tax income.")
+
+            for _ in range(GOAL_SEEK_MAX_ITERATIONS):
+                if upper - lower <= resolution:
+                    break
+                middle = (lower + upper) / 2
+                evaluations += 1
+                income = income_at(middle)
+                if income >= target_income:
+                    upper = middle
+                    if income - target_income <= income_tolerance:
+                        break
+                else:
+                    lower = middle
+        value = upper
+
+    digits = round(-math.log10(resolution))
+    value = math.ceil(round(value / resolution, 6)) * resolution
+    solved_inputs = dict(inputs, **{input_key: round(value, digits)})
+    return {
+        'solve_for': solve_for,
+        'value': round(value, digits),
+        'year': year,
+        'target_after_tax_income': target_income,
+        'achieved_after_tax_income': round(after_tax_income_in_year(solved_inputs, year), 2),
+        'evaluations': evaluations,
+        'results': calculate_projections_from_inputs(solved_inputs),
+    }
+
+
+# --- Portfolio Projections ---
+
+# Fields set once for a whole portfolio; a holding's own values for them are ignored.
+PORTFOLIO_SHARED_FIELDS = ('time_horizon', 'tax_exemption_threshold', 'inflation_rate', 'dividend_tax_brackets_input')
+PORTFOLIO_MAX_HOLDINGS = parse_int(os.environ.get('DIVIDEND_PORTFOLIO_MAX_HOLDINGS'), 5000)
+
+
+def portfolio_holding_forms(holding_form_data_list, portfolio_form_data):
+    """Each holding's form_data with the portfolio-wide PORTFOLIO_SHARED_FIELDS applied."""
+    shared = {field: portfolio_form_data[field] for field in PORTFOLIO_SHARED_FIELDS if field in portfolio_form_data}
+    holding_forms = []
+    for form_data in holding_form_data_list:
+        holding_form = {field: value for field, value in form_data.items() if field not in PORTFOLIO_SHARED_FIELDS}
+        holding_form.update(shared)
+        holding_forms.append(holding_form)
+    return holding_forms
+
+
+def calculate_portfolio_projections(holding_form_data_list, portfolio_form_data):
+    """
+    Projects every holding of a portfolio in one vectorized pass. Holdings
+    share the time horizon, inflation rate and tax settings of
+    portfolio_form_data; each year their gross dividends are taxed once as a
+    total, and the after-tax income (and with it DRIP reinvestment) is
+    allocated back to holdings pro-rata to their gross income.
+
+    Returns {'holdings': [results dict per holding, as calculate_all_projections
+    builds it], 'portfolio': aggregate yearly series and totals}.
+    """
+    parsed_inputs_list = [parse_projection_inputs(form_data)
+                          for form_data in portfolio_holding_forms(holding_form_data_list, portfolio_form_data)]
+    tax_schedule = parsed_inputs_list[0]['tax_schedule']
+    tax_exemption_threshold = parsed_inputs_list[0]['tax_exemption_threshold']
+    time_horizon = max(parsed_inputs_list[0]['time_horizon'], 0)
+
+    batch = calculate_batch_projections(build_scenario_columns(parsed_inputs_list), tax_schedule, pooled_tax=True)
+    projected = batch['projected']
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        annual_gross_income = projected['annual_gross_income'].sum(axis=0)
+        annual_after_tax_income = tax_schedule.after_tax_income_array(
+            annual_gross_income, np.full(time_horizon, tax_exemption_threshold))
+        portfolio_value = (projected['shares_owned'] * projected['share_price']).sum(axis=0)
+        effective_tax_rate = np.where(annual_gross_income > 0,
+                                      (1 - annual_after_tax_income / annual_gross_income) * 100, 0.0)
+    cumulative_gross_income = np.cumsum(annual_gross_income)
+    cumulative_after_tax_income = np.cumsum(annual_after_tax_income)
+
+    if time_horizon:
+        total_cumulative_gross = float(cumulative_gross_income[-1])
+        total_cumulative_after_tax = float(cumulative_after_tax_income[-1])
+        final_portfolio_value = float(portfolio_value[-1])
+    else:
+        total_cumulative_gross = 0.0
+        total_cumulative_after_tax = 0.0
+        final_portfolio_value = float(np.sum(batch['final_shares'] * batch['final_share_price']))
+
+    return {
+        'holdings': [batch_results(inputs, batch, index) for index, inputs in enumerate(parsed_inputs_list)],
+        'portfolio': {
+            'holding_count': len(parsed_inputs_list),
+            'projected_data': {
+                'years': list(range(1, time_horizon + 1)),
+                'annual_gross_income': [round(v, 2) for v in annual_gross_income.tolist()],
+                'annual_after_tax_income': [round(v, 2) for v in annual_after_tax_income.tolist()],
+                'cumulative_gross_income': [round(v, 2) for v in cumulative_gross_income.tolist()],
+                'cumulative_after_tax_income': [round(v, 2) for v in cumulative_after_tax_income.tolist()],
+                'portfolio_value': [round(v, 2) for v in portfolio_value.tolist()],
+                'effective_tax_rate': [round(v, 2) for v in effective_tax_rate.tolist()],
+            },
+            'final_portfolio_value': round(final_portfolio_value, 2),
+            'total_cumulative_gross_income': round(total_cumulative_gross, 2),
+            'total_cumulative_after_tax_income': round(total_cumulative_after_tax, 2),
+            'total_return_value': round(final_portfolio_value + total_cumulative_after_tax, 2),
+        },
+    }
+
+
+# --- Input Validation ---
+
+# Longest projection any entry point accepts; batch engines allocate one
+# (scenarios x years) array per series, so this bounds their memory.
+MAX_TIME_HORIZON = 1000
+# Most custom payouts per year; per-payout DRIP steps through each one.
+MAX_PAYOUTS_PER_YEAR = 365
+
+
+def validate_projection_form(form_data):
+    """
+    Applies the input validation rules of the main form to a scenario.
+    Returns an error message for the first invalid field, or None if the
+    scenario can be passed to calculate_all_projections.
+    """
+    # Basic input validation for critical fields
+    # Check for presence and valid numeric conversion
+    required_float_fields = ['initial_shares', 'current_price', 'inflation_rate']
+    for field in required_float_fields:
+        if not form_data.get(field) or parse_float(form_data.get(field), -1) < 0:
+            return f"Please enter a valid positive number for {field.replace('_', ' ').title()}."
+    
+    # Specific dividend input validation based on yield type
+    selected_yield_type = form_data.get('yield_type', 'indicated')
+    dividend_input_present = False
+    if selected_yield_type == 'indicated' and parse_float(form_data.get('annual_dividend_indicated'), -1) >= 0:
+        dividend_input_present = True
+    elif selected_yield_type == 'trailing' and parse_float(form_data.get('ttm_dividend'), -1) >= 0:
+        dividend_input_present = True
+    elif selected_yield_type == 'forward' and parse_float(form_data.get('next_expected_dividend'), -1) >= 0:
+        dividend_input_present = True
+    
+    if not dividend_input_present:
+        return "Please enter a valid non-negative dividend amount for the selected yield type."
+
+    if form_data.get('dividend_frequency') == 'custom':
+        if not 1 <= parse_int(form_data.get('custom_frequency_number'), 0) <= MAX_PAYOUTS_PER_YEAR:
+            return f"Number of Payouts Per Year must be between 1 and {MAX_PAYOUTS_PER_YEAR}."
+
+    # Time horizon validation
+    time_horizon = parse_int(form_data.get('time_horizon'), 0)
+    if time_horizon <= 0:
+        return "Time Horizon must be a positive integer."
+    if time_horizon > MAX_TIME_HORIZON:
+        return f"Time Horizon cannot exceed {MAX_TIME_HORIZON} years."
+
+    if parse_float(form_data.get('annual_contribution')) < 0:
+        return "Annual Contribution cannot be negative."
+
+    return None
+
+
+def scenario_to_form_data(scenario):
+    """
+    Converts a JSON scenario object into the string-valued form_data shape
+    that index() receives, so API callers go through the same parsing and
+    validation. Booleans become checkbox values ('on' / absent).
+    """
+    form_data = {}
+    for field, value in scenario.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            if value:
+                form_data[field] = 'on'
+            continue
+        form_data[field] = str(value)
+    return form_data
+
+
+def request_scenario_form_data(scenario, exclude=()):
+    """
+    scenario_to_form_data for the scalar fields of an API request object,
+    skipping nested objects and arrays (distribution specs, grid axes,
+    holdings) and any field named in exclude.
+    """
+    return scenario_to_form_data({key: value for key, value in scenario.items()
+                                  if key not in exclude and not isinstance(value, (dict, list))})
+
+
+def iter_scenario_batches(scenarios, chunk_size=API_BATCH_CHUNK_SIZE, run_batch=None):
+    """
+    Validates scenarios and runs them through calculate_all_projections_batch
+    (or another run_batch callable with the same signature) in chunks,
+    yielding one (index, scenario_id, results, error) tuple per scenario in
+    input order. Only one chunk is held in memory at a time.
+    """
+    def entries():
+        for index, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict):
+                yield index, None, None, "Scenario must be a JSON object."
+            else:
+                form_data = scenario_to_form_data(scenario)
+                yield index, scenario.get('scenario_id'), form_data, validate_projection_form(form_data)
+
+    return iter_form_batches(entries(), chunk_size, run_batch)
+
+
+def iter_form_batches(entries, chunk_size=API_BATCH_CHUNK_SIZE, run_batch=None, isolate_failures=False):
+    """
+    Runs already validated (index, scenario_id, form_data, error) entries
+    through run_batch (default calculate_all_projections_batch) in chunks of
+    chunk_size, yielding (index, scenario_id, results, error) in input order;
+    entries with an error are passed through without being computed. With
+    isolate_failures=True a chunk whose batch raises is recomputed row by row,
+    so one bad scenario only fails its own row.
+    """
+    run_batch = run_batch if run_batch is not None else calculate_all_projections_batch
+    chunk = []
+
+    def run_chunk():
+        valid = [(index, form_data) for index, _, form_data, error in chunk if error is None]
+        errors = {}
+        try:
+            computed = run_batch([form_data for _, form_data in valid]) if valid else []
+        except Exception:
+            if not isolate_failures:
+                raise
+            app.logger.error("Batch projection failed; retrying its scenarios one at a time", exc_info=True)
+            computed = []
+            for index, form_data in valid:
+                try:
+                    computed.append(calculate_all_projections(form_data))
+                except Exception as e:
+                    computed.append(None)
+                    errors[index] = f"Projection failed: {e}"
+        results_by_index = {index: results for (index, _), results in zip(valid, computed)}
+        for index, scenario_id, _, error in chunk:
+            yield index, scenario_id, results_by_index.get(index), error or errors.get(index)
+
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield from run_chunk()
+            chunk = []
+    if chunk:
+        yield from run_chunk()
+
+
+def iter_ndjson_lines(stream):
+    """Yields the decoded JSON value of every non-blank line of a binary stream."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+# Checkbox fields of the main form; uploaded files may spell them as any of UPLOAD_TRUE_VALUES
+UPLOAD_CHECKBOX_FIELDS = ('drip_toggle',)
+UPLOAD_TRUE_VALUES = ('on', 'true', '1', 'yes', 'y')
+
+
+def iter_csv_scenarios(text_stream):
+    """
+    Reads an uploaded CSV (header row of form field names, one scenario per
+    row) lazily and yields (line_number, scenario_id, form_data, error) per
+    row, validated like index(). Empty cells are left out so form defaults
+    apply. Malformed rows become errors instead of stopping the file.
+    """
+    reader = csv.DictReader(text_stream)
+    while True:
+        line_number = reader.line_num
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, None, None, f"Malformed CSV row: {e}"
+            if reader.line_num == line_number:
+                return
+            continue
+
+        if None in row:
+            yield reader.line_num, None, None, "Row has more fields than the header."
+            continue
+        form_data = {field.strip(): value.strip() for field, value in row.items()
+                     if field and value is not None and value.strip()}
+        for field in UPLOAD_CHECKBOX_FIELDS:
+            if field in form_data:
+                if form_data[field].lower() in UPLOAD_TRUE_VALUES:
+                    form_data[field] = 'on'
+                else:
+                    del form_data[field]
+        yield reader.line_num, form_data.get('scenario_id'), form_data, validate_projection_form(form_data)
+
+
+def iter_jsonl_scenarios(stream):
+    """
+    Reads an uploaded JSONL file (one scenario object per line) lazily and
+    yields (line_number, scenario_id, form_data, error) per non-blank line,
+    validated like index(). Unparsable lines become errors.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            scenario = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(scenario, dict):
+            yield line_number, None, None, "Scenario must be a JSON object."
+            continue
+        form_data = scenario_to_form_data(scenario)
+        yield line_number, scenario.get('scenario_id'), form_data, validate_projection_form(form_data)
+
+
+# --- Result Cache ---
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store with an optional time-to-live. Entries are evicted
+    least-recently-used first once max_entries is reached.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries = collections.OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _CACHE_MISS
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                return _CACHE_MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ThreadLocalSQLite:
+    """Base for stores on one SQLite file, holding one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn = conn
+        return conn
+
+
+class SQLiteCacheBackend(ThreadLocalSQLite):
+    """
+    File-backed LRU store, so several worker processes on one host can share
+    cached results. Values are pickled; the file must only be writable by the
+    application itself. Each cache keeps its entries in its own table, so
+    one file can hold several caches without their size limits interacting.
+    """
+
+    def __init__(self, path, max_entries=1024, ttl_seconds=None, table='projection_cache'):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name '{table}'.")
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self.evictions = 0
+        with self._connection() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+
+    def get(self, key):
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _CACHE_MISS
+            value, stored_at = row
+            if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.evictions += 1
+                return _CACHE_MISS
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, now)
+            )
+            evicted = conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ProjectionCache:
+    """
+    Memoizes computed results by input hash on top of a pluggable backend
+    (MemoryCacheBackend or SQLiteCacheBackend) and counts hits and misses.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing and storing it on a miss."""
+        value = self.backend.get(key)
+        if value is not _CACHE_MISS:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self.backend.set(key, value)
+        return value
+
+    def __contains__(self, key):
+        # A presence check only; not counted as a hit or a miss
+        return self.backend.get(key) is not _CACHE_MISS
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'size': len(self.backend),
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+def projection_cache_key(inputs):
+    """
+    Canonical hash of parsed projection inputs (see parse_projection_inputs).
+    Keyed on parsed values, including the parsed tax slabs, so equivalent
+    forms (e.g. "5" and "5.0", or unused dividend fields) share one entry.
+    """
+    canonical = {key: value for key, value in inputs.items() if key not in ('tax_schedule', 'parsed_tax_slabs')}
+    canonical['tax_slabs'] = [(float(threshold), float(rate)) for threshold, rate in inputs['tax_schedule'].key]
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def create_projection_cache(table='projection_cache'):
+    """
+    Builds the shared projection cache from the environment:
+    DIVIDEND_CACHE_PATH selects the SQLite backend (shared between workers),
+    DIVIDEND_CACHE_MAX_ENTRIES and DIVIDEND_CACHE_TTL bound its size and age.
+    Caches sharing the file each pass their own table.
+    """
+    max_entries = parse_int(os.environ.get('DIVIDEND_CACHE_MAX_ENTRIES'), 256)
+    ttl_seconds = parse_float(os.environ.get('DIVIDEND_CACHE_TTL'), 600.0) or None
+    cache_path = os.environ.get('DIVIDEND_CACHE_PATH')
+    if cache_path:
+        return ProjectionCache(SQLiteCacheBackend(cache_path, max_entries=max_entries, ttl_seconds=ttl_seconds, table=table))
+    return ProjectionCache(MemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds))
+
+
+projection_cache = create_projection_cache()
+
+# Per-process store of projection traces for incremental recomputation
+projection_checkpoints = MemoryCacheBackend(
+    max_entries=parse_int(os.environ.get('DIVIDEND_CHECKPOINT_MAX_ENTRIES'), 256)
+)
+
+
+def get_cached_projections(form_data):
+    """
+    calculate_all_projections through the shared projection cache, so the
+    Calculate, Download CSV and Download PDF posts of one form compute once.
+    On a cache miss, results saved in the scenario store for the same inputs
+    are reused before anything is recomputed (see get_stored_results).
+    """
+    with timed_span('parse_inputs'):
+        inputs = parse_projection_inputs(form_data)
+    key = projection_cache_key(inputs)
+
+    def compute():
+        results = get_stored_results(key)
+        if results is _CACHE_MISS:
+            results = calculate_projections_incremental(inputs)
+        return results
+
+    return projection_cache.get_or_compute(key, compute)
+
+
+# --- Scenario Store ---
+
+# Saved scenarios older than DIVIDEND_STORE_RETENTION_DAYS are deleted, and
+# beyond DIVIDEND_STORE_MAX_ENTRIES the oldest are evicted first. Set
+# DIVIDEND_STORE_PATH to also serve projection cache misses from saved results.
+STORE_PATH = os.environ.get('DIVIDEND_STORE_PATH')
+STORE_MAX_ENTRIES = parse_int(os.environ.get('DIVIDEND_STORE_MAX_ENTRIES'), 100000)
+STORE_RETENTION_DAYS = parse_float(os.environ.get('DIVIDEND_STORE_RETENTION_DAYS'), 90.0)
+# Bump whenever the projection engine changes its results for the same inputs,
+# so snapshots computed by an older engine are not reused for new requests.
+STORE_ENGINE_VERSION = 1
+
+
+class ScenarioStore(ThreadLocalSQLite):
+    """
+    SQLite store of saved scenarios and their computed results. The form
+    fields and summary values are kept as JSON and projected_data as one
+    compressed float64 blob (ProjectionSeries.to_blob), so a reload gives
+    back the full-precision results without recomputing. Rows are looked up
+    by their primary-key id, and indexed by input hash (to reuse results for
+    identical inputs), by owner and by creation time (for listing and
+    retention).
+    """
+
+    def __init__(self, path, max_entries=STORE_MAX_ENTRIES, retention_seconds=STORE_RETENTION_DAYS * 86400):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.retention_seconds = retention_seconds or None
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenarios ("
+                "id TEXT PRIMARY KEY, owner TEXT, input_hash TEXT NOT NULL, engine_version INTEGER NOT NULL, "
+                "form_data TEXT NOT NULL, summary TEXT NOT NULL, years INTEGER NOT NULL, series BLOB NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scenarios_input_hash ON scenarios (input_hash, engine_version)")
+            conn.execute("CREATE INDEX IF NOT EXISTS scenarios_owner_created_at ON scenarios (owner, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS scenarios_created_at ON scenarios (created_at)")
+
+    def _cutoff(self):
+        """Creation time before which rows are past retention."""
+        return time.time() - self.retention_seconds if self.retention_seconds is not None else float('-inf')
+
+    def save(self, form_data, input_hash, results, owner=None):
+        """
+        Saves a scenario and returns its id. Saving the same inputs again for
+        the same owner returns the existing id instead of a duplicate.
+        """
+        with self._connection() as conn:
+            self._prune(conn)
+            row = conn.execute(
+                "SELECT id FROM scenarios WHERE input_hash = ? AND engine_version = ? AND owner IS ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (input_hash, STORE_ENGINE_VERSION, owner)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+
+            projected_data = results['projected_data']
+            summary = {key: value for key, value in results.items() if key != 'projected_data'}
+            scenario_id = secrets.token_urlsafe(12)
+            conn.execute(
+                "INSERT INTO scenarios (id, owner, input_hash, engine_version, form_data, summary, years, series, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scenario_id, owner, input_hash, STORE_ENGINE_VERSION, json.dumps(form_data), json.dumps(summary),
+                 len(projected_data['years']), projected_data.to_blob(), time.time())
+            )
+            conn.execute(
+                "DELETE FROM scenarios WHERE id IN ("
+                "SELECT id FROM scenarios ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        return scenario_id
+
+    def _prune(self, conn):
+        if self.retention_seconds is not None:
+            conn.execute("DELETE FROM scenarios WHERE created_at < ?", (self._cutoff(),))
+
+    @staticmethod
+    def _results(summary, years, series):
+        results = json.loads(summary)
+        results['projected_data'] = ProjectionSeries.from_blob(series, years)
+        return results
+
+    def get(self, scenario_id):
+        """The saved scenario (id, owner, input_hash, created_at, form_data, results), or None."""
+        row = self._connection().execute(
+            "SELECT owner, input_hash, form_data, summary, years, series, created_at FROM scenarios "
+            "WHERE id = ? AND created_at >= ?",
+            (scenario_id, self._cutoff())
+        ).fetchone()
+        if row is None:
+            return None
+        owner, input_hash, form_data, summary, years, series, created_at = row
+        return {
+            'scenario_id': scenario_id,
+            'owner': owner,
+            'input_hash': input_hash,
+            'created_at': created_at,
+            'form_data': json.loads(form_data),
+            'results': self._results(summary, years, series),
+        }
+
+    def get_results_by_input_hash(self, input_hash):
+        """Results of the newest saved scenario with these inputs and engine version, or _CACHE_MISS."""
+        row = self._connection().execute(
+            "SELECT summary, years, series FROM scenarios "
+            "WHERE input_hash = ? AND engine_version = ? AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+            (input_hash, STORE_ENGINE_VERSION, self._cutoff())
+        ).fetchone()
+        return _CACHE_MISS if row is None else self._results(*row)
+
+    def list_scenarios(self, owner, limit=50):
+        """Newest-first metadata (id, owner, input_hash, created_at) of an owner's saved scenarios."""
+        rows = self._connection().execute(
+            "SELECT id, owner, input_hash, created_at FROM scenarios WHERE owner = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (owner, self._cutoff(), limit)
+        ).fetchall()
+        return [dict(zip(('scenario_id', 'owner', 'input_hash', 'created_at'), row)) for row in rows]
+
+    def delete(self, scenario_id, owner=None):
+        """Deletes a saved scenario if it belongs to owner; returns whether it did."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM scenarios WHERE id = ? AND owner IS ?", (scenario_id, owner)).rowcount > 0
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+
+
+_scenario_store = None
+_scenario_store_lock = threading.Lock()
+
+
+def get_scenario_store():
+    """
+    Returns the shared ScenarioStore, opening it on first use at STORE_PATH
+    (default: scenarios.db in the Flask instance folder). Raises
+    sqlite3.Error or OSError when the database cannot be opened.
+    """
+    global _scenario_store
+    with _scenario_store_lock:
+        if _scenario_store is None:
+            path = STORE_PATH
+            if not path:
+                os.makedirs(app.instance_path, exist_ok=True)
+                path = os.path.join(app.instance_path, 'scenarios.db')
+            _scenario_store = ScenarioStore(path)
+        return _scenario_store
+
+
+def get_stored_results(input_hash):
+    """
+    Saved results for an input hash when DIVIDEND_STORE_PATH is configured,
+    else _CACHE_MISS. A store that cannot be read is logged and treated as a
+    miss, so projections never depend on it.
+    """
+    if not STORE_PATH:
+        return _CACHE_MISS
+    try:
+        return get_scenario_store().get_results_by_input_hash(input_hash)
+    except (sqlite3.Error, OSError) as e:
+        app.logger.warning(f"Scenario store unavailable, recomputing: {e}")
+        return _CACHE_MISS
+
+
+# --- Export Helpers ---
+
+CSV_HEADERS = [
+    "Year", "Shares Owned", "Share Price ($)", "Dividend/Share ($)",
+    "Annual Gross Income ($)", "Annual After-Tax Income ($)",
+    "Cumulative Gross Income ($)", "Cumulative After-Tax Income ($)",
+    "Nominal Yield (%)", "Real Yield (%)"
+]
+
+
+def format_projection_rows(projected_data):
+    """Yields one formatted table row per projected year, as shown in the CSV and PDF exports."""
+    for i in range(len(projected_data['years'])):
+        yield [
+            projected_data['years'][i],
+            f"{projected_data['shares_owned'][i]:.4f}",
+            f"{projected_data['share_price'][i]:.2f}",
+            f"{projected_data['annual_dividend_per_share'][i]:.2f}",
+            f"{projected_data['annual_gross_income'][i]:.2f}",
+            f"{projected_data['annual_after_tax_income'][i]:.2f}",
+            f"{projected_data['cumulative_gross_income'][i]:.2f}",
+            f"{projected_data['cumulative_after_tax_income'][i]:.2f}",
+            f"{projected_data['nominal_yield_over_time'][i]:.2f}" if projected_data['nominal_yield_over_time'][i] is not None else "N/A",
+            f"{projected_data['real_yield_over_time'][i]:.2f}" if projected_data['real_yield_over_time'][i] is not None else "N/A"
+        ]
+
+
+def iter_csv_lines(rows):
+    """Encodes rows to CSV one line at a time, reusing a single small buffer."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def iter_gzip(chunks, flush_size=64 * 1024):
+    """Gzip-compresses a stream of text chunks, emitting compressed blocks of roughly flush_size bytes."""
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 selects the gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending += len(data)
+        compressed = compressor.compress(data)
+        if pending >= flush_size:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+BATCH_CSV_HEADERS = ["Scenario ID", "Error"] + CSV_HEADERS
+
+
+def iter_batch_csv_rows(scenarios):
+    """
+    Yields CSV rows for a batch of JSON scenarios, prefixed with a Scenario ID
+    column (the scenario's scenario_id, or its position in the batch) and an
+    Error column. An invalid scenario gets a single row carrying its error.
+    """
+    yield BATCH_CSV_HEADERS
+    empty_projection = [''] * len(CSV_HEADERS)
+    for index, scenario_id, results, error in iter_scenario_batches(scenarios):
+        row_id = scenario_id if scenario_id is not None else index
+        if error is not None:
+            yield [row_id, error] + empty_projection
+            continue
+        for row in format_projection_rows(results['projected_data']):
+            yield [row_id, ''] + row
+
+
+UPLOAD_RESULT_HEADERS = ["Line", "Scenario ID", "Error"] + CSV_HEADERS
+
+
+def detach_upload_stream(upload):
+    """
+    A binary file object for an uploaded file that stays open after the
+    request ends (Werkzeug closes uploads when the view returns, before a
+    streamed response is read). Spooled-to-disk uploads are reopened through
+    a duplicated descriptor; small in-memory ones are copied.
+    """
+    try:
+        return os.fdopen(os.dup(upload.stream.fileno()), 'rb')
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return io.BytesIO(upload.stream.read())
+
+
+def iter_upload_result_rows(entries):
+    """
+    CSV rows for uploaded scenarios: every projected year of a valid row, or
+    a single row carrying the error of an invalid one, each prefixed with the
+    source line number and scenario_id.
+    """
+    yield UPLOAD_RESULT_HEADERS
+    empty_projection = [''] * len(CSV_HEADERS)
+    for line_number, scenario_id, results, error in iter_form_batches(entries, isolate_failures=True):
+        row_id = scenario_id if scenario_id is not None else ''
+        if error is not None:
+            yield [line_number, row_id, error] + empty_projection
+            continue
+        for row in format_projection_rows(results['projected_data']):
+            yield [line_number, row_id, ''] + row
+
+
+def streaming_csv_response(rows, filename):
+    """
+    Streams rows as a CSV attachment. Compresses with gzip when the request
+    asks for it (gzip=1) and the client accepts gzip encoding.
+    """
+    chunks = iter_timed('csv_format', iter_csv_lines(rows))
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if request.values.get('gzip') in ('1', 'true', 'on'):
+        # The encoding depends on Accept-Encoding, so caches must key on it
+        headers["Vary"] = "Accept-Encoding"
+        if 'gzip' in request.accept_encodings:
+            chunks = iter_gzip(chunks)
+            headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(chunks), mimetype="text/csv", headers=headers)
+
+
+# Binary export formats served by /download_data: format -> (mimetype, file extension)
+COLUMNAR_EXPORT_FORMATS = {
+    'npz': ('application/octet-stream', 'npz'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def projected_data_columns(projected_data):
+    """
+    Converts a ProjectionSeries into typed NumPy columns (years as int64,
+    every series as full-precision float64 with N/A yields as NaN), without
+    any rounding or string formatting.
+    """
+    columns = {'year': projected_data.column('years')}
+    for key in BATCH_SERIES_KEYS:
+        columns[key] = projected_data.column(key)
+    return columns
+
+
+def batch_projection_columns(scenarios):
+    """
+    Columns for a batch of JSON scenarios in long format: one row per
+    scenario and year, with leading scenario_id (the scenario's scenario_id,
+    or its position in the batch) and error columns. An invalid scenario
+    gets a single row with year 0, NaN series and its error message.
+    """
+    scenario_ids = []
+    errors = []
+    parts = {}
+    for index, scenario_id, results, error in iter_scenario_batches(scenarios):
+        row_id = str(scenario_id if scenario_id is not None else index)
+        if error is not None:
+            scenario_ids.append(row_id)
+            errors.append(error)
+            parts.setdefault('year', []).append(np.zeros(1, dtype=np.int64))
+            for key in BATCH_SERIES_KEYS:
+                parts.setdefault(key, []).append(np.full(1, np.nan))
+            continue
+        columns = projected_data_columns(results['projected_data'])
+        scenario_ids.extend([row_id] * len(columns['year']))
+        errors.extend([''] * len(columns['year']))
+        for key, values in columns.items():
+            parts.setdefault(key, []).append(values)
+
+    columns = {'scenario_id': np.asarray(scenario_ids, dtype=str), 'error': np.asarray(errors, dtype=str)}
+    columns['year'] = np.concatenate(parts['year']) if parts else np.empty(0, dtype=np.int64)
+    for key in BATCH_SERIES_KEYS:
+        columns[key] = np.concatenate(parts[key]) if parts else np.empty(0)
+    return columns
+
+
+def write_columnar_export(columns, export_format):
+    """
+    Serializes columns to .npz, Arrow IPC or Parquet bytes. Arrow and Parquet
+    need the optional pyarrow package; a RuntimeError is raised without it.
+    """
+    buffer = io.BytesIO()
+    if export_format == 'npz':
+        np.savez(buffer, **columns)
+        return buffer.getvalue()
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Arrow and Parquet exports require the pyarrow package.")
+
+    table = pyarrow.table(columns)
+    if export_format == 'arrow':
+        with pyarrow.ipc.new_file(buffer, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pyarrow.parquet.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+# --- PDF Reports ---
+
+# ReportLab is imported on first use (see pdf_report_templates), so sizes are in
+# points here: 72 points per inch.
+PDF_POINTS_PER_INCH = 72.0
+# Custom page size (16 inches width x 10 inches height) and margins of the PDF report
+PDF_PAGE_SIZE = (16 * PDF_POINTS_PER_INCH, 10 * PDF_POINTS_PER_INCH)
+PDF_MARGIN = 30
+PDF_HEADERS = [
+    "Year", "Shares Owned", "Share Price($)", "Dividend/Share($)", "Annual Gross Income($)", "Annual After-Tax Income($)",
+    "Cumulative Gross Income($)", "Cumulative After-Tax Income($)", "Nominal Yield %", "Real Yield %"
+]
+# Share of the available width given to each column, in PDF_HEADERS order
+PDF_COLUMN_FRACTIONS = [0.04, 0.10, 0.09, 0.11, 0.12, 0.13, 0.13, 0.14, 0.07, 0.07]
+# Batches of at least this many reports are rendered on the process pool
+PDF_POOL_MIN_BATCH = 4
+
+
+@functools.lru_cache(maxsize=1)
+def pdf_report_templates():
+    """
+    Builds the report's title style, table style and column widths once per
+    process. The title style is derived from the sample 'h1' style rather
+    than modifying it. The first call also pays for importing ReportLab,
+    which is kept out of module import to speed up worker start.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'ReportTitle', parent=styles['h1'], alignment=1, fontSize=14, fontName="Helvetica-Bold"
+    )
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+    available_width = PDF_PAGE_SIZE[0] - 2 * PDF_MARGIN
+    col_widths = [fraction * available_width for fraction in PDF_COLUMN_FRACTIONS]
+    return title_style, table_style, col_widths
+
+
+def render_pdf_report(results):
+    """
+    Renders the dividend projection report for a results dict to PDF bytes
+    using ReportLab's SimpleDocTemplate and Table objects. Long tables split
+    across pages with the header row repeated on each page.
+    """
+    title_style, table_style, col_widths = pdf_report_templates()
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=PDF_PAGE_SIZE,
+                            rightMargin=PDF_MARGIN, leftMargin=PDF_MARGIN,
+                            topMargin=PDF_MARGIN, bottomMargin=PDF_MARGIN)
+
+    table_data = [PDF_HEADERS]
+    table_data.extend(format_projection_rows(results['projected_data']))
+    table = Table(table_data, colWidths=col_widths, repeatRows=1)
+    table.setStyle(table_style)
+
+    with timed_span('pdf_layout'):
+        doc.build([
+            Paragraph("Dividend Projection Report", title_style),
+            Spacer(1, 0.2 * PDF_POINTS_PER_INCH),
+            table,
+        ])
+    return buffer.getvalue()
+
+
+def render_pdf_report_for_form(form_data):
+    """Computes and renders the PDF report for one form. Used as the process pool task."""
+    return render_pdf_report(calculate_all_projections(form_data))
+
+
+pdf_report_cache = create_projection_cache('pdf_report_cache')
+
+# Set DIVIDEND_PREWARM_EXPORTS=1 to load ReportLab in the background right after startup
+PREWARM_EXPORTS = os.environ.get('DIVIDEND_PREWARM_EXPORTS', '0').lower() in ('1', 'true', 'on')
+
+
+def prewarm_exports():
+    """Imports ReportLab and builds the PDF templates so the first PDF download does not wait for them."""
+    try:
+        with timed_span('export_prewarm'):
+            pdf_report_templates()
+    except Exception as e:
+        app.logger.warning(f"Prewarming PDF export failed: {e}", exc_info=True)
+
+
+def start_export_prewarm():
+    """Runs prewarm_exports on a daemon thread and returns the thread."""
+    thread = threading.Thread(target=prewarm_exports, name='export-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_cached_pdf_report(form_data):
+    """
+    PDF bytes for a form, cached by the same input hash as the projection
+    results (under a 'pdf:' prefix, so both can share one backend).
+    """
+    inputs = parse_projection_inputs(form_data)
+    key = projection_cache_key(inputs)
+    return pdf_report_cache.get_or_compute(
+        'pdf:' + key, lambda: render_pdf_report(get_cached_projections(form_data))
+    )
+
+
+def get_cached_stored_pdf_report(scenario):
+    """PDF bytes for a saved scenario (see ScenarioStore.get), sharing the cache entry of its inputs."""
+    return pdf_report_cache.get_or_compute(
+        'pdf:' + scenario['input_hash'], lambda: render_pdf_report(scenario['results'])
+    )
+
+
+def render_pdf_reports(form_data_list, executor=None):
+    """
+    Renders one PDF report per form, in order. Batches of PDF_POOL_MIN_BATCH
+    or more are rendered in parallel on the process pool, since ReportLab
+    layout is CPU-bound.
+    """
+    if len(form_data_list) < PDF_POOL_MIN_BATCH:
+        return [render_pdf_report_for_form(form_data) for form_data in form_data_list]
+    executor = executor if executor is not None else get_process_pool()
+    return list(executor.map(render_pdf_report_for_form, form_data_list))
+
+
+# --- Chart Data ---
+
+# Series drawn on the results page, and the point budgets of chart payloads
+CHART_DEFAULT_SERIES = ('nominal_yield_over_time', 'real_yield_over_time')
+CHART_DEFAULT_POINTS = 500
+CHART_MAX_POINTS = 10000
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Indices of at most `threshold` points of (x, y) chosen with the
+    Largest-Triangle-Three-Buckets algorithm: the first and last points are
+    kept, and from each bucket in between the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    This preserves the visual shape of a line chart far better than striding.
+    """
+    point_count = len(x)
+    if threshold >= point_count:
+        return np.arange(point_count)
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points.")
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = point_count - 1
+    bucket_size = (point_count - 2) / (threshold - 2)
+    kept = 0
+    for bucket in range(threshold - 2):
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, point_count)
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+
+        start = int(bucket * bucket_size) + 1
+        bucket_x = x[start:next_start]
+        bucket_y = y[start:next_start]
+        areas = np.abs((x[kept] - average_x) * (bucket_y - y[kept]) - (x[kept] - bucket_x) * (average_y - y[kept]))
+        kept = start + int(np.argmax(areas))
+        indices[bucket + 1] = kept
+    return indices
+
+
+def build_chart_payload(projected_data, series_keys=CHART_DEFAULT_SERIES, max_points=CHART_DEFAULT_POINTS):
+    """
+    Chart-ready points for the requested projected_data series, each
+    downsampled independently with LTTB to at most max_points from the
+    full-precision columns and then rounded like the results table. N/A
+    values (e.g. real yields) are null and do not pull the selection.
+    """
+    years = projected_data.column('years')
+    payload = {'total_points': len(years), 'max_points': max_points, 'series': {}}
+    for key in series_keys:
+        values = projected_data.column(key)
+        with np.errstate(over='ignore', invalid='ignore'):
+            indices = lttb_indices(years.astype(float), np.where(np.isfinite(values), values, 0.0), max_points)
+        digits = 4 if key == 'shares_owned' else 2
+        payload['series'][key] = {
+            'x': years[indices].tolist(),
+            'y': [round(v, digits) if math.isfinite(v) else None for v in values[indices].tolist()],
+        }
+    return payload
+
+
+chart_data_cache = create_projection_cache('chart_data_cache')
+
+
+def chart_data_cache_key(inputs, series_keys=CHART_DEFAULT_SERIES, max_points=CHART_DEFAULT_POINTS):
+    """chart_data_cache key: the projection input hash plus the requested series and point budget."""
+    return f"chart:{projection_cache_key(inputs)}:{','.join(series_keys)}:{max_points}"
+
+
+def get_cached_chart_data(form_data, series_keys=CHART_DEFAULT_SERIES, max_points=CHART_DEFAULT_POINTS):
+    """
+    Chart payload for a form, cached by the projection input hash plus the
+    requested series and point budget (under a 'chart:' prefix).
+    """
+    key = chart_data_cache_key(parse_projection_inputs(form_data), series_keys, max_points)
+    return chart_data_cache.get_or_compute(
+        key, lambda: build_chart_payload(get_cached_projections(form_data)['projected_data'], series_keys, max_points)
+    )
+
+
+# --- Flask Routes ---
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe_request(request.endpoint or 'unknown', request.method, response.status_code,
+                                time.perf_counter() - started)
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Exposes stage timings, request counts and cache hit rates in Prometheus text format."""
+    body = metrics.render_prometheus({'projection': projection_cache, 'pdf_report': pdf_report_cache,
+                                      'chart_data': chart_data_cache},
+                                     {'offload': offload_pool})
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/', methods=['GET', 'POST'])
+def index():
+    """
+    Handles the main application route, processes form submissions,
+    and renders the dividend projection results.
+    """
+    results = None
+    chart_data = None
+    error_message = None
+
+    if request.method == 'POST':
+        form_data = request.form.to_dict()
+
+        error_message = validate_projection_form(form_data)
+        if error_message:
+            return render_template('index.html', results=results, error=error_message)
+
+        try:
+            results = get_cached_projections(form_data)
+            chart_data = get_cached_chart_data(form_data)
+        except Exception as e:
+            error_message = f"An unexpected error occurred during calculation: {e}"
+            app.logger.error(f"Error during projection calculation: {e}", exc_info=True)
+
+    with timed_span('render_template'):
+        return render_template('index.html',
+                               results=results,
+                               chart_data=chart_data,
+                               error=error_message)
+
+@app.route('/api/projections', methods=['POST'])
+def api_projections():
+    """
+    Runs a batch of projection scenarios and streams the results as NDJSON.
+    Accepts either a JSON array of scenario objects or an NDJSON body
+    (Content-Type: application/x-ndjson) with one scenario per line. Each
+    scenario uses the same fields as the main form; each output line is
+    {"index", "scenario_id", "results"} or {"index", "scenario_id", "error"}.
+    With ?mode=process, each chunk is sharded across the process pool.
+    """
+    if request.args.get('mode') == 'process':
+        chunk_size = PROCESS_POOL_CHUNK_SIZE * PROJECTION_WORKERS
+        run_batch = calculate_all_projections_parallel
+    else:
+        chunk_size = API_BATCH_CHUNK_SIZE
+        run_batch = calculate_all_projections_batch
+
+    if request.mimetype == 'application/x-ndjson':
+        scenarios = iter_ndjson_lines(request.stream)
+    else:
+        scenarios = request.get_json(silent=True)
+        if not isinstance(scenarios, list):
+            return jsonify({'error': "Request body must be a JSON array of scenarios."}), 400
+
+    def generate():
+        try:
+            for index, scenario_id, results, error in iter_scenario_batches(scenarios, chunk_size, run_batch):
+                line = {'index': index, 'scenario_id': scenario_id}
+                if error is None:
+                    line['results'] = results
+                else:
+                    line['error'] = error
+                yield dumps_strict_json(line) + '\n'
+        except ValueError as e:
+            app.logger.error(f"Invalid NDJSON scenario input: {e}", exc_info=True)
+            yield json.dumps({'error': f"Invalid scenario input: {e}"}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/monte_carlo', methods=['POST'])
+def api_monte_carlo():
+    """
+    Runs a Monte Carlo projection for one scenario posted as JSON. Besides the
+    main form fields it accepts n_paths, seed, percentiles, and
+    dividend_growth / share_price_growth distribution specs (see
+    draw_growth_rates). Returns per-year percentile bands.
+    """
+    scenario = request.get_json(silent=True)
+    if not isinstance(scenario, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+
+    form_data = request_scenario_form_data(scenario)
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return jsonify({'error': error_message}), 400
+
+    if parse_int(form_data.get('time_horizon')) > MONTE_CARLO_MAX_YEARS:
+        return jsonify({'error': f"time_horizon must be at most {MONTE_CARLO_MAX_YEARS} years for Monte Carlo runs."}), 400
+    n_paths = parse_int(scenario.get('n_paths'), 10000)
+    if not 0 < n_paths <= MONTE_CARLO_MAX_PATHS:
+        return jsonify({'error': f"n_paths must be between 1 and {MONTE_CARLO_MAX_PATHS}."}), 400
+    seed = scenario.get('seed')
+    if seed is not None and (not isinstance(seed, int) or seed < 0):
+        return jsonify({'error': "seed must be a non-negative integer."}), 400
+    for field in ('dividend_growth', 'share_price_growth'):
+        if scenario.get(field) is not None and not isinstance(scenario[field], dict):
+            return jsonify({'error': f"{field} must be a distribution object."}), 400
+    percentiles = scenario.get('percentiles', (5, 50, 95))
+    if (not isinstance(percentiles, (list, tuple)) or not percentiles
+            or not all(isinstance(p, (int, float)) and not isinstance(p, bool) and 0 <= p <= 100 for p in percentiles)):
+        return jsonify({'error': "percentiles must be a non-empty list of numbers between 0 and 100."}), 400
+
+    try:
+        simulation = simulate_monte_carlo_projections(
+            parse_projection_inputs(form_data),
+            n_paths=n_paths,
+            dividend_growth=scenario.get('dividend_growth'),
+            share_price_growth=scenario.get('share_price_growth'),
+            seed=seed,
+            percentiles=tuple(float(p) for p in percentiles),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(simulation)
+
+
+@app.route('/api/sensitivity', methods=['POST'])
+def api_sensitivity():
+    """
+    Sweeps one scenario over a two-dimensional parameter grid posted as JSON.
+    Besides the main form fields it takes rows and columns objects, each
+    {"field": <one of SENSITIVITY_AXES>, "values": [...]}, e.g. dividend
+    vs. share price growth, or drip_toggle [false, true] vs. a list of
+    dividend_tax_brackets_input strings. Returns row-major matrices of
+    total_return_value and final-year after-tax income for a heatmap.
+    """
+    scenario = request.get_json(silent=True)
+    if not isinstance(scenario, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+
+    axes = []
+    for name in ('rows', 'columns'):
+        axis = scenario.get(name)
+        if not isinstance(axis, dict) or axis.get('field') not in SENSITIVITY_AXES:
+            return jsonify({'error': f"{name} must be an object with a field from: {', '.join(SENSITIVITY_AXES)}."}), 400
+        values = axis.get('values')
+        if not isinstance(values, list) or not values or any(isinstance(value, (dict, list)) for value in values):
+            return jsonify({'error': f"{name}.values must be a non-empty array of values."}), 400
+        axes.append((axis['field'], values))
+    (row_field, row_values), (column_field, column_values) = axes
+    if row_field == column_field:
+        return jsonify({'error': "rows and columns must sweep different fields."}), 400
+    if len(row_values) * len(column_values) > SENSITIVITY_MAX_CELLS:
+        return jsonify({'error': f"The grid may have at most {SENSITIVITY_MAX_CELLS} cells."}), 400
+
+    form_data = request_scenario_form_data(scenario)
+    error_message = validate_projection_form(form_data)
+    for field, values in axes:
+        for value in values:
+            error_message = error_message or validate_projection_form(sensitivity_axis_form(form_data, field, value))
+    if error_message:
+        return jsonify({'error': error_message}), 400
+    horizons = [values for field, values in axes if field == 'time_horizon'] or [[form_data.get('time_horizon')]]
+    longest_horizon = max(parse_int(value, 0) for value in horizons[0])
+    if len(row_values) * len(column_values) * longest_horizon > SENSITIVITY_MAX_CELL_YEARS:
+        return jsonify({'error': f"cells x time_horizon may be at most {SENSITIVITY_MAX_CELL_YEARS}."}), 400
+
+    grid = calculate_sensitivity_grid(form_data, row_field, row_values, column_field, column_values)
+    return jsonify({
+        'rows': {'field': row_field, 'values': row_values},
+        'columns': {'field': column_field, 'values': column_values},
+        'total_return_value': sensitivity_matrix(grid['total_return_value']),
+        'final_after_tax_income': sensitivity_matrix(grid['final_after_tax_income']),
+    })
+
+
+@app.route('/api/goal_seek', methods=['POST'])
+def api_goal_seek():
+    """
+    Solves one scenario, posted as JSON, for the initial_shares,
+    annual_contribution or dividend_growth_rate (solve_for) needed to reach
+    target_income of after-tax dividend income in year (default: the time
+    horizon). Returns the solved value and the full projection results for it.
+    """
+    scenario = request.get_json(silent=True)
+    if not isinstance(scenario, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+
+    solve_for = scenario.get('solve_for')
+    if solve_for not in GOAL_SEEK_VARIABLES:
+        return jsonify({'error': f"solve_for must be one of: {', '.join(GOAL_SEEK_VARIABLES)}."}), 400
+    target_income = parse_float(scenario.get('target_income'), -1)
+    if target_income < 0:
+        return jsonify({'error': "target_income must be a non-negative number."}), 400
+
+    form_data = request_scenario_form_data(scenario)
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return jsonify({'error': error_message}), 400
+    inputs = parse_projection_inputs(form_data)
+    year = parse_int(scenario.get('year'), inputs['time_horizon'])
+
+    try:
+        return jsonify(solve_goal_seek(inputs, solve_for, target_income, year))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/portfolio', methods=['POST'])
+def api_portfolio():
+    """
+    Projects a portfolio posted as JSON: {"holdings": [...], ...}. Each
+    holding takes the main form fields for one stock (plus an optional
+    holding_id); time_horizon, tax_exemption_threshold, inflation_rate and
+    dividend_tax_brackets_input are set once at the top level. Tax applies to
+    the portfolio's total dividend income. Returns per-holding results and
+    aggregate yearly series.
+    """
+    portfolio = request.get_json(silent=True)
+    if not isinstance(portfolio, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+    holdings = portfolio.get('holdings')
+    if not isinstance(holdings, list) or not holdings or not all(isinstance(holding, dict) for holding in holdings):
+        return jsonify({'error': "holdings must be a non-empty array of objects."}), 400
+    if len(holdings) > PORTFOLIO_MAX_HOLDINGS:
+        return jsonify({'error': f"A portfolio may have at most {PORTFOLIO_MAX_HOLDINGS} holdings."}), 400
+
+    portfolio_form_data = request_scenario_form_data(portfolio)
+    holding_forms = [scenario_to_form_data({key: value for key, value in holding.items() if key != 'holding_id'})
+                     for holding in holdings]
+    for index, form_data in enumerate(portfolio_holding_forms(holding_forms, portfolio_form_data)):
+        error_message = validate_projection_form(form_data)
+        if error_message:
+            return jsonify({'error': f"Holding {index}: {error_message}"}), 400
+
+    projection = calculate_portfolio_projections(holding_forms, portfolio_form_data)
+    for holding, results in zip(holdings, projection['holdings']):
+        results['holding_id'] = holding.get('holding_id')
+    return jsonify(projection)
+
+
+@app.route('/upload_scenarios', methods=['POST'])
+def upload_scenarios():
+    """
+    Bulk import: accepts a CSV (header of form field names) or JSONL file of
+    scenarios, as the scenarios_file upload or as the raw request body
+    (text/csv or application/x-ndjson), and streams back one CSV with the
+    projections of every valid row and an inline error for every invalid one.
+    format=csv|jsonl overrides detection from the file name or content type.
+    """
+    upload = request.files.get('scenarios_file')
+    if upload is not None:
+        stream, filename, mimetype = detach_upload_stream(upload), upload.filename or '', upload.mimetype
+    elif request.mimetype in ('text/csv', 'application/x-ndjson', 'application/jsonl'):
+        stream, filename, mimetype = request.stream, '', request.mimetype
+    else:
+        return "Upload a CSV or JSONL file as scenarios_file.", 400
+
+    upload_format = request.args.get('format') or request.form.get('format')
+    if not upload_format:
+        is_jsonl = filename.lower().endswith(('.jsonl', '.ndjson')) or mimetype in ('application/x-ndjson', 'application/jsonl')
+        upload_format = 'jsonl' if is_jsonl else 'csv'
+    if upload_format == 'csv':
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        entries = iter_csv_scenarios(stream)
+    elif upload_format == 'jsonl':
+        entries = iter_jsonl_scenarios(stream)
+    else:
+        return f"Unsupported upload format '{upload_format}'.", 400
+
+    def rows():
+        with stream:
+            yield from iter_upload_result_rows(entries)
+
+    return streaming_csv_response(rows(), "dividend_projections_upload.csv")
+
+
+@app.route('/api/chart_data', methods=['POST'])
+def api_chart_data():
+    """
+    Returns chart points for one scenario posted as JSON: the projected_data
+    series named in series (default: nominal and real yield), each
+    downsampled server-side with LTTB to at most points (default
+    CHART_DEFAULT_POINTS). Payloads are cached per input hash.
+    """
+    scenario = request.get_json(silent=True)
+    if not isinstance(scenario, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+
+    series_keys = scenario.get('series', list(CHART_DEFAULT_SERIES))
+    if not isinstance(series_keys, list) or not series_keys or any(key not in BATCH_SERIES_KEYS for key in series_keys):
+        return jsonify({'error': f"series must be a non-empty array of: {', '.join(BATCH_SERIES_KEYS)}."}), 400
+    max_points = parse_int(scenario.get('points'), CHART_DEFAULT_POINTS)
+    if not 3 <= max_points <= CHART_MAX_POINTS:
+        return jsonify({'error': f"points must be between 3 and {CHART_MAX_POINTS}."}), 400
+
+    form_data = request_scenario_form_data(scenario)
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return jsonify({'error': error_message}), 400
+    return jsonify(get_cached_chart_data(form_data, tuple(series_keys), max_points))
+
+
+@app.route('/api/scenarios', methods=['POST'])
+def api_save_scenario():
+    """
+    Computes one scenario posted as JSON (main form fields plus an optional
+    owner) and saves it with its results in the scenario store. Returns the
+    scenario_id to reopen it or re-download its CSV/PDF without recomputing.
+    """
+    scenario = request.get_json(silent=True)
+    if not isinstance(scenario, dict):
+        return jsonify({'error': "Request body must be a JSON object."}), 400
+    owner = scenario.get('owner')
+    if owner is not None and not isinstance(owner, str):
+        return jsonify({'error': "owner must be a string."}), 400
+
+    form_data = request_scenario_form_data(scenario, exclude=('owner',))
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return jsonify({'error': error_message}), 400
+
+    input_hash = projection_cache_key(parse_projection_inputs(form_data))
+    results = get_cached_projections(form_data)
+    try:
+        scenario_id = get_scenario_store().save(form_data, input_hash, results, owner)
+    except (sqlite3.Error, OSError) as e:
+        app.logger.error(f"Error saving scenario: {e}", exc_info=True)
+        return jsonify({'error': "Scenario store is unavailable."}), 503
+    return jsonify({'scenario_id': scenario_id, 'input_hash': input_hash}), 201
+
+
+@app.route('/api/scenarios', methods=['GET'])
+def api_list_scenarios():
+    """Lists the newest saved scenarios of ?owner= (ids and creation times only)."""
+    owner = request.args.get('owner')
+    if not owner:
+        return jsonify({'error': "owner is required."}), 400
+    limit = parse_int(request.args.get('limit'), 50)
+    if not 0 < limit <= 1000:
+        return jsonify({'error': "limit must be between 1 and 1000."}), 400
+    try:
+        return jsonify(get_scenario_store().list_scenarios(owner, limit))
+    except (sqlite3.Error, OSError) as e:
+        app.logger.error(f"Error listing scenarios: {e}", exc_info=True)
+        return jsonify({'error': "Scenario store is unavailable."}), 503
+
+
+@app.route('/api/scenarios/<scenario_id>', methods=['GET'])
+def api_get_scenario(scenario_id):
+    """Returns a saved scenario's form fields and results by id."""
+    try:
+        scenario = get_scenario_store().get(scenario_id)
+    except (sqlite3.Error, OSError) as e:
+        app.logger.error(f"Error loading scenario: {e}", exc_info=True)
+        return jsonify({'error': "Scenario store is unavailable."}), 503
+    if scenario is None:
+        return jsonify({'error': "Saved scenario not found."}), 404
+    return jsonify(scenario)
+
+
+@app.route('/api/scenarios/<scenario_id>', methods=['DELETE'])
+def api_delete_scenario(scenario_id):
+    """
+    Deletes a saved scenario. ?owner= must match the owner it was saved
+    with (omitted for scenarios saved without one).
+    """
+    try:
+        deleted = get_scenario_store().delete(scenario_id, request.args.get('owner'))
+    except (sqlite3.Error, OSError) as e:
+        app.logger.error(f"Error deleting scenario: {e}", exc_info=True)
+        return jsonify({'error': "Scenario store is unavailable."}), 503
+    if not deleted:
+        return jsonify({'error': "Saved scenario not found."}), 404
+    return '', 204
+
+
+@app.route('/download_csv', methods=['POST'])
+def download_csv():
+    """
+    Generates and serves a CSV file containing the dividend projection data.
+    Rows are streamed as they are formatted. A JSON array of scenarios
+    produces one combined file with a Scenario ID column; gzip=1 requests a
+    gzip-encoded transfer; scenario_id re-downloads a saved scenario.
+    """
+    if request.is_json:
+        scenarios = request.get_json(silent=True)
+        if not isinstance(scenarios, list):
+            return "Request body must be a JSON array of scenarios.", 400
+        return streaming_csv_response(iter_batch_csv_rows(scenarios), "dividend_projections_batch.csv")
+
+    scenario_id = request.values.get('scenario_id')
+    if scenario_id:
+        try:
+            scenario = get_scenario_store().get(scenario_id)
+        except (sqlite3.Error, OSError) as e:
+            app.logger.error(f"Error loading scenario: {e}", exc_info=True)
+            return "Scenario store is unavailable.", 503
+        if scenario is None:
+            return "Saved scenario not found.", 404
+        rows = itertools.chain([CSV_HEADERS], format_projection_rows(scenario['results']['projected_data']))
+        return streaming_csv_response(rows, f"dividend_projections_{secure_filename(scenario_id)}.csv")
+
+    form_data = request.form.to_dict()
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return error_message, 400
+    try:
+        results = get_cached_projections(form_data)
+        rows = itertools.chain([CSV_HEADERS], format_projection_rows(results['projected_data']))
+        return streaming_csv_response(rows, "dividend_projections.csv")
+
+    except Exception as e:
+        app.logger.error(f"Error generating CSV: {e}", exc_info=True)
+        return "Error generating CSV file.", 500
+
+
+@app.route('/download_data', methods=['POST'])
+def download_data():
+    """
+    Serves projected_data as a typed binary columnar file, selected by the
+    format parameter: npz (default), arrow or parquet. A JSON array of
+    scenarios exports every scenario in long format with a scenario_id column.
+    """
+    export_format = request.args.get('format') or request.form.get('format', 'npz')
+    if export_format not in COLUMNAR_EXPORT_FORMATS:
+        return f"Unsupported export format '{export_format}'.", 400
+    mimetype, extension = COLUMNAR_EXPORT_FORMATS[export_format]
+
+    try:
+        if request.is_json:
+            scenarios = request.get_json(silent=True)
+            if not isinstance(scenarios, list):
+                return "Request body must be a JSON array of scenarios.", 400
+            columns = batch_projection_columns(scenarios)
+            download_name = f"dividend_projections_batch.{extension}"
+        else:
+            form_data = request.form.to_dict()
+            error_message = validate_projection_form(form_data)
+            if error_message:
+                return error_message, 400
+            results = get_cached_projections(form_data)
+            columns = projected_data_columns(results['projected_data'])
+            download_name = f"dividend_projections.{extension}"
+        payload = write_columnar_export(columns, export_format)
+    except RuntimeError as e:
+        return str(e), 501
+    except Exception as e:
+        app.logger.error(f"Error generating {export_format} export: {e}", exc_info=True)
+        return f"Error generating {export_format} file.", 500
+
+    return send_file(io.BytesIO(payload), as_attachment=True, download_name=download_name, mimetype=mimetype)
+
+
+@app.route('/download_pdf', methods=['POST'])
+def download_pdf():
+    """
+    Generates a PDF document with a dividend projection report using ReportLab's
+    SimpleDocTemplate and Table objects for structured content. A JSON array
+    of scenarios returns a zip archive with one report per valid scenario;
+    scenario_id re-downloads a saved scenario.
+    """
+    if request.is_json:
+        scenarios = request.get_json(silent=True)
+        if not isinstance(scenarios, list):
+            return "Request body must be a JSON array of scenarios.", 400
+        return download_pdf_batch(scenarios)
+
+    scenario_id = request.values.get('scenario_id')
+    if scenario_id:
+        try:
+            scenario = get_scenario_store().get(scenario_id)
+        except (sqlite3.Error, OSError) as e:
+            app.logger.error(f"Error loading scenario: {e}", exc_info=True)
+            return "Scenario store is unavailable.", 503
+        if scenario is None:
+            return "Saved scenario not found.", 404
+        return send_file(
+            io.BytesIO(get_cached_stored_pdf_report(scenario)),
+            as_attachment=True,
+            download_name=f"dividend_projections_{secure_filename(scenario_id)}.pdf",
+            mimetype="application/pdf"
+        )
+
+    form_data = request.form.to_dict()
+    error_message = validate_projection_form(form_data)
+    if error_message:
+        return error_message, 400
+    try:
+        return send_file(
+            io.BytesIO(get_cached_pdf_report(form_data)),
+            as_attachment=True,
+            download_name="dividend_projections.pdf",
+            mimetype="application/pdf"
+        )
+
+    except Exception as e:
+        app.logger.error(f"Error generating PDF: {e}", exc_info=True)
+        return "Error generating PDF file.", 500
+
+
+def download_pdf_batch(scenarios):
+    """
+    Renders a batch of JSON scenarios into a zip of PDF reports named by
+    scenario_id (suffixed with the batch position when ids repeat). Invalid
+    scenarios are listed with their errors in an errors.csv entry.
+    """
+    names = []
+    forms = []
+    errors = []
+    used_names = set()
+    for index, scenario in enumerate(scenarios):
+        form_data = scenario_to_form_data(scenario) if isinstance(scenario, dict) else None
+        error = validate_projection_form(form_data) if form_data is not None else "Scenario must be a JSON object."
+        scenario_id = str(scenario.get('scenario_id', index)) if isinstance(scenario, dict) else str(index)
+        if error is not None:
+            errors.append([scenario_id, error])
+            continue
+        name = f"dividend_projections_{secure_filename(scenario_id) or 'scenario'}"
+        if name in used_names:
+            name = f"{name}_{index}"
+        used_names.add(name)
+        names.append(name)
+        forms.append(form_data)
+
+    try:
+        reports = render_pdf_reports(forms)
+    except Exception as e:
+        app.logger.error(f"Error generating PDF batch: {e}", exc_info=True)
+        return "Error generating PDF files.", 500
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:  # PDFs are already compressed
+        for name, report in zip(names, reports):
+            archive.writestr(f"{name}.pdf", report)
+        if errors:
+            archive.writestr("errors.csv", ''.join(iter_csv_lines([["Scenario ID", "Error"]] + errors)))
+    buffer.seek(0)
+    return send_file(buffer, as_attachment=True, download_name="dividend_projections.zip",
+                     mimetype="application/zip")
+
+
+# --- Async Serving ---
+
+# ASGI mode (e.g. `uvicorn app:asgi_app`): requests under these path prefixes
+# run on a bounded worker pool, reading their body and streaming their output
+# through the event loop; everything else (GETs, main-form posts answered from
+# the caches, /metrics) is served directly on the event loop.
+OFFLOAD_PATH_PREFIXES = ('/api/', '/download_', '/upload_scenarios')
+# Largest request body accepted in either serving mode (413 beyond it)
+MAX_REQUEST_BYTES = parse_int(os.environ.get('DIVIDEND_MAX_REQUEST_BYTES'), 64 * 1024 * 1024)
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+OFFLOAD_WORKERS = parse_int(os.environ.get('DIVIDEND_OFFLOAD_WORKERS'), os.cpu_count() or 1)
+OFFLOAD_QUEUE_DEPTH = parse_int(os.environ.get('DIVIDEND_OFFLOAD_QUEUE_DEPTH'), 2 * OFFLOAD_WORKERS)
+OFFLOAD_RETRY_AFTER = parse_int(os.environ.get('DIVIDEND_OFFLOAD_RETRY_AFTER'), 1)
+
+
+class WorkerPoolSaturated(RuntimeError):
+    """Raised by BoundedExecutor.submit when every worker is busy and the queue is full."""
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor that admits at most max_workers running plus
+    max_queue waiting tasks. Further submissions are rejected immediately
+    with WorkerPoolSaturated instead of queueing without bound, so callers
+    can shed load (503) while queued work still finishes in bounded time.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.capacity = max_workers + max_queue
+        self.rejected = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='offload')
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise WorkerPoolSaturated(f"All {self.capacity} offload slots are in use.")
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': self._in_flight, 'capacity': self.capacity, 'rejected': self.rejected}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+offload_pool = BoundedExecutor(OFFLOAD_WORKERS, OFFLOAD_QUEUE_DEPTH)
+
+
+class AsgiRequestBody(io.RawIOBase):
+    """
+    Blocking, readable view of an ASGI request body for a worker thread:
+    each read pulls the next http.request message through the event loop,
+    so the body is parsed as it arrives instead of being buffered first.
+    Reading past max_bytes raises RequestEntityTooLarge (a 413 response).
+    """
+
+    def __init__(self, receive, loop, max_bytes=MAX_REQUEST_BYTES):
+        super().__init__()
+        self._receive = receive
+        self._loop = loop
+        self._max_bytes = max_bytes
+        self._received = 0
+        self._pending = b''
+        self._finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._finished:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                raise ConnectionAbortedError("Client disconnected.")
+            self._pending = message.get('body', b'')
+            self._finished = not message.get('more_body')
+            self._received += len(self._pending)
+            if self._received > self._max_bytes:
+                raise RequestEntityTooLarge()
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def asgi_to_wsgi_environ(scope, body):
+    """
+    Builds a PEP 3333 environ for an ASGI HTTP scope. body is either the
+    fully read request body (bytes) or a readable stream; a stream is marked
+    wsgi.input_terminated so Werkzeug reads it to the end, within
+    MAX_CONTENT_LENGTH.
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body) if isinstance(body, bytes) else body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    # The server has already de-chunked the body
+    environ.pop('HTTP_TRANSFER_ENCODING', None)
+    if isinstance(body, bytes):
+        environ['CONTENT_LENGTH'] = str(len(body))
+    else:
+        environ['wsgi.input_terminated'] = True
+    return environ
+
+
+def index_post_is_cached(scope, body):
+    """
+    Whether a main-form POST (URL-encoded) can be answered without computing:
+    it fails validation, or its projection and chart data are both cached.
+    AsgiApp serves such posts on the event loop and offloads the rest.
+    """
+    if scope['path'] != '/':
+        return False
+    headers = dict(scope.get('headers', []))
+    if not headers.get(b'content-type', b'').startswith(b'application/x-www-form-urlencoded'):
+        return False
+    form_data = {}
+    for key, value in urllib.parse.parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True):
+        form_data.setdefault(key, value)  # first value wins, like request.form.to_dict()
+    if validate_projection_form(form_data):
+        return True
+    inputs = parse_projection_inputs(form_data)
+    return projection_cache_key(inputs) in projection_cache and chart_data_cache_key(inputs) in chart_data_cache
+
+
+def run_wsgi_request(wsgi_app, environ, emit):
+    """
+    Runs one WSGI request, calling emit(status, headers) once and then
+    emit(None, chunk) for every non-empty body chunk as it is produced.
+    """
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(' ', 1)[0]), headers]
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        headers_sent = False
+        for chunk in iterable:
+            if chunk:
+                if not headers_sent:
+                    emit(*started)
+                    headers_sent = True
+                emit(None, chunk)
+        if not headers_sent:
+            emit(*started)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+class AsgiApp:
+    """
+    ASGI entry point around the Flask WSGI app. Requests whose path starts
+    with one of offload_prefixes are admitted to the bounded pool (or get an
+    immediate 503 with Retry-After when it is saturated), read their body
+    from the worker as it arrives, and stream their response back through a
+    small bounded queue, so a slow client holds its worker instead of
+    letting input or output pile up. Other GET/HEAD requests, and other
+    requests for which is_cached(scope, body) holds, are handled inline on
+    the event loop; the remaining ones are offloaded with their (at most
+    max_body_bytes) body already read.
+    """
+
+    def __init__(self, wsgi_app, pool, offload_prefixes=OFFLOAD_PATH_PREFIXES, retry_after=OFFLOAD_RETRY_AFTER,
+                 is_cached=index_post_is_cached, max_body_bytes=MAX_REQUEST_BYTES):
+        self.wsgi_app = wsgi_app
+        self.pool = pool
+        self.offload_prefixes = offload_prefixes
+        self.retry_after = retry_after
+        self.is_cached = is_cached
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        if scope['path'].startswith(self.offload_prefixes):
+            environ = asgi_to_wsgi_environ(
+                scope, io.BufferedReader(AsgiRequestBody(receive, loop, self.max_body_bytes)))
+        else:
+            body = await self._read_body(receive)
+            if body is None:
+                await self._send_error(send, 413, [], b"Request body is too large.")
+                return
+            if scope['method'] in ('GET', 'HEAD') or self.is_cached(scope, body):
+                chunks = []
+                run_wsgi_request(self.wsgi_app, asgi_to_wsgi_environ(scope, body),
+                                 lambda status, data: chunks.append((status, data)))
+                for status, data in chunks:
+                    await self._send(send, status, data)
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            environ = asgi_to_wsgi_environ(scope, body)
+
+        queue = asyncio.Queue(maxsize=8)
+        disconnected = threading.Event()
+
+        def emit(status, data):
+            if disconnected.is_set():
+                raise ConnectionAbortedError("Client disconnected.")
+            asyncio.run_coroutine_threadsafe(queue.put((status, data)), loop).result()
+
+        def run():
+            try:
+                run_wsgi_request(self.wsgi_app, environ, emit)
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+        try:
+            future = self.pool.submit(run)
+        except WorkerPoolSaturated as e:
+            app.logger.warning(f"Rejecting {scope['method']} {scope['path']}: {e}")
+            await self._send_error(send, 503, [(b'retry-after', str(self.retry_after).encode('latin-1'))],
+                                   b"Server is busy, please retry shortly.")
+            return
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                await self._send(send, *item)
+        except BaseException:
+            # Stop the worker at its next chunk and let it finish so its slot is freed
+            disconnected.set()
+            while await queue.get() is not None:
+                pass
+            raise
+        await asyncio.wrap_future(future)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _read_body(self, receive):
+        """The whole request body, or None once it exceeds max_body_bytes."""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.extend(message.get('body', b''))
+            if len(body) > self.max_body_bytes:
+                return None
+            if not message.get('more_body'):
+                break
+        return bytes(body)
+
+    @staticmethod
+    async def _send_error(send, status, headers, message):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')] + headers})
+        await send({'type': 'http.response.body', 'body': message})
+
+    @staticmethod
+    async def _send(send, status, data):
+        if status is None:
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+        else:
+            headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in data]
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+asgi_app = AsgiApp(app, offload_pool)
+
+
+if PREWARM_EXPORTS:
+    start_export_prewarm()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+"""
+Benchmark suite for the projection, tax and export hot paths of app.py.
+
+Run from this directory:
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --output new_results.json
+
+Every case records its median and best time per call, plus a checksum of
+its output. When a baseline file is given, the run fails (exit code 1) if a
+case became slower than the baseline by more than --tolerance, or if its
+output checksum changed, i.e. a faster engine is no longer numerically
+equivalent.
+
+The "import app" case times a cold import in a fresh interpreter. Its output
+lists which LAZY_MODULES were loaded, and the run fails if any of them was,
+since those must only be imported when an export first needs them.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import platform
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import app as calculator
+
+
+HORIZONS = [1, 10, 30, 50, 100]
+SLAB_COUNTS = [1, 4, 16]
+# Modules app.py must not import at startup
+LAZY_MODULES = ['reportlab', 'pyarrow']
+
+STARTUP_SCRIPT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'loaded': [m for m in sys.argv[1:] if m in sys.modules]}))\n"
+)
+
+
+def make_brackets_input(slab_count):
+    """Tax brackets string with slab_count evenly spaced progressive slabs."""
+    return ','.join(f"{i * 10000}:{min(5 * i, 45)}" for i in range(slab_count))
+
+
+def make_form(time_horizon, drip_enabled, slab_count):
+    """A representative main-form submission."""
+    form_data = {
+        'initial_shares': '250',
+        'current_price': '42.50',
+        'yield_type': 'indicated',
+        'annual_dividend_indicated': '1.85',
+        'dividend_frequency': 'quarterly',
+        'dividend_growth_rate': '6.5',
+        'share_price_growth_rate': '4.0',
+        'time_horizon': str(time_horizon),
+        'tax_exemption_threshold': '1000',
+        'inflation_rate': '2.5',
+        'dividend_tax_brackets_input': make_brackets_input(slab_count),
+        'payout_ratio': '55',
+        'debt_to_equity': '0.8',
+        'free_cash_flow': '250000000',
+        'eps': '3.40',
+    }
+    if drip_enabled:
+        form_data['drip_toggle'] = 'on'
+    return form_data
+
+
+def checksum(value):
+    """Stable SHA-256 of a JSON-serializable value, used to detect numerical changes."""
+    def default(o):
+        if isinstance(o, calculator.ProjectionSeries):
+            return o.to_dict()
+        return repr(o)
+
+    encoded = json.dumps(value, sort_keys=True, default=default).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def time_case(func, repeat, number):
+    """Runs func number times per round for repeat rounds; returns per-call timings and the last output."""
+    timings = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            output = func()
+        timings.append((time.perf_counter() - start) / number)
+    return timings, output
+
+
+def import_app_cold():
+    """
+    Imports app in a fresh interpreter and returns {'seconds', 'loaded'}:
+    the import time measured inside the subprocess (so interpreter start-up
+    is excluded) and the LAZY_MODULES that were loaded eagerly.
+    """
+    env = dict(os.environ, DIVIDEND_PREWARM_EXPORTS='0')
+    completed = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT] + LAZY_MODULES,
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def time_startup(repeat):
+    """Timings of repeat cold imports of app, and the LAZY_MODULES loaded by the last one."""
+    reports = [import_app_cold() for _ in range(repeat)]
+    return [report['seconds'] for report in reports], reports[-1]['loaded']
+
+
+def clear_caches():
+    """Drops cached results so every timed call does the full amount of work."""
+    calculator.projection_cache.clear()
+    calculator.projection_checkpoints.clear()
+    calculator.pdf_report_cache.clear()
+    calculator.chart_data_cache.clear()
+
+
+def build_cases(quick=False):
+    """Returns a list of (name, func, number) benchmark cases."""
+    horizons = [1, 10, 50] if quick else HORIZONS
+    slab_counts = [1, 4] if quick else SLAB_COUNTS
+    cases = []
+
+    for time_horizon in horizons:
+        for drip_enabled in (False, True):
+            for slab_count in slab_counts:
+                form_data = make_form(time_horizon, drip_enabled, slab_count)
+                name = f"calculate_all_projections[years={time_horizon},drip={'on' if drip_enabled else 'off'},slabs={slab_count}]"
+                cases.append((name, lambda form_data=form_data: calculator.calculate_all_projections(form_data), 20))
+
+    batch_forms = [make_form(30, i % 2 == 0, 4) for i in range(200 if quick else 1000)]
+    cases.append((
+        f"calculate_all_projections_batch[scenarios={len(batch_forms)},years=30]",
+        lambda: calculator.calculate_all_projections_batch(batch_forms),
+        1,
+    ))
+
+    for slab_count in slab_counts:
+        tax_slabs = calculator.parse_dividend_tax_brackets_input(make_brackets_input(slab_count))
+        incomes = [i * 1234.5 for i in range(200)]
+        cases.append((
+            f"calculate_after_tax_income[slabs={slab_count},incomes=200]",
+            lambda tax_slabs=tax_slabs, incomes=incomes: [
+                calculator.calculate_after_tax_income(income, tax_slabs, 1000) for income in incomes
+            ],
+            20,
+        ))
+
+        brackets_input = make_brackets_input(slab_count)
+        cases.append((
+            f"parse_dividend_tax_brackets_input[slabs={slab_count}]",
+            lambda brackets_input=brackets_input: calculator.parse_dividend_tax_brackets_input(brackets_input),
+            200,
+        ))
+
+    client = calculator.app.test_client()
+    for time_horizon in horizons:
+        form_data = make_form(time_horizon, True, 4)
+
+        def post_csv(form_data=form_data):
+            clear_caches()
+            response = client.post('/download_csv', data=form_data)
+            return response.get_data(as_text=True)
+
+        def post_pdf(form_data=form_data):
+            clear_caches()
+            response = client.post('/download_pdf', data=form_data)
+            # PDF bytes embed creation timestamps, so only the size is stable
+            return {'status': response.status_code, 'length': len(response.get_data())}
+
+        cases.append((f"POST /download_csv[years={time_horizon}]", post_csv, 5))
+        cases.append((f"POST /download_pdf[years={time_horizon}]", post_pdf, 2))
+
+    return cases
+
+
+def run_benchmarks(repeat=5, quick=False):
+    """Runs every case and returns the machine-readable results document."""
+    results = {}
+    timings, loaded = time_startup(repeat)
+    results['import app'] = {
+        'median_seconds': statistics.median(timings),
+        'best_seconds': min(timings),
+        'repeat': repeat,
+        'number': 1,
+        'checksum': checksum(loaded),
+        'eager_lazy_modules': loaded,
+    }
+    print(f"{'import app':<75} median {results['import app']['median_seconds'] * 1e3:10.3f} ms")
+
+    for name, func, number in build_cases(quick):
+        timings, output = time_case(func, repeat, number)
+        results[name] = {
+            'median_seconds': statistics.median(timings),
+            'best_seconds': min(timings),
+            'repeat': repeat,
+            'number': number,
+            'checksum': checksum(output),
+        }
+        print(f"{name:<75} median {results[name]['median_seconds'] * 1e3:10.3f} ms")
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def check_startup(current):
+    """Returns a problem message for every LAZY_MODULES entry that app imported at startup."""
+    return [f"import app: {module} is imported at startup"
+            for module in current['results']['import app']['eager_lazy_modules']]
+
+
+def compare_to_baseline(current, baseline, tolerance):
+    """Returns a list of regression messages comparing current results to a baseline document."""
+    problems = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        if result['checksum'] != previous['checksum']:
+            problems.append(f"{name}: output differs from baseline")
+        if result['median_seconds'] > previous['median_seconds'] * (1 + tolerance):
+            problems.append(
+                f"{name}: {result['median_seconds'] * 1e3:.3f} ms vs baseline "
+                f"{previous['median_seconds'] * 1e3:.3f} ms"
+            )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results.")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline (0.25 = 25%%).")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing rounds per case.")
+    parser.add_argument('--quick', action='store_true', help="Run a reduced set of cases.")
+    args = parser.parse_args(argv)
+
+    calculator.app.logger.setLevel(logging.ERROR)
+    current = run_benchmarks(repeat=args.repeat, quick=args.quick)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Wrote {len(current['results'])} results to {args.output}")
+
+    problems = check_startup(current)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems.extend(compare_to_baseline(current, baseline, args.tolerance))
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        return 1
+    if args.baseline:
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
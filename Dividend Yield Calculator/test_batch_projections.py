@@ -0,0 +1,69 @@
+"""
+Checks that the vectorized batch engine stays numerically identical to the
+scalar calculate_all_projections path.
+
+Run from this directory:
+
+    python -m pytest -q
+"""
+import json
+import logging
+import random
+
+import app as calculator
+
+
+calculator.app.logger.setLevel(logging.CRITICAL)
+
+
+def random_form(rng):
+    """A random main-form submission covering every yield type, frequency and DRIP mode."""
+    form_data = {
+        'initial_shares': str(rng.uniform(0, 5000)),
+        'current_price': str(rng.choice([rng.uniform(0.5, 300), 0])),
+        'yield_type': rng.choice(['indicated', 'trailing', 'forward']),
+        'annual_dividend_indicated': str(rng.uniform(0, 10)),
+        'ttm_dividend': str(rng.uniform(0, 10)),
+        'next_expected_dividend': str(rng.uniform(0, 3)),
+        'dividend_frequency': rng.choice(['monthly', 'quarterly', 'semi-annual', 'annual', 'custom']),
+        'custom_frequency_number': str(rng.randint(1, 6)),
+        'dividend_growth_rate': str(rng.uniform(-5, 15)),
+        'share_price_growth_rate': str(rng.uniform(-10, 15)),
+        'time_horizon': str(rng.randint(0, 60)),
+        'tax_exemption_threshold': str(rng.choice([0, 1000, 5000])),
+        'inflation_rate': str(rng.choice([0, 2.5, 3, -150])),
+        'dividend_tax_brackets_input': rng.choice(['', '0:10,10000:15', '5000:20,1000:5,1000:7', 'bad']),
+        'payout_ratio': '50',
+        'debt_to_equity': '0.5',
+        'free_cash_flow': '100',
+        'eps': '3',
+    }
+    if rng.random() < 0.5:
+        form_data['drip_toggle'] = 'on'
+    if rng.random() < 0.3:
+        form_data['drip_compounding'] = 'per_payout'
+    if rng.random() < 0.3:
+        form_data['annual_contribution'] = str(rng.uniform(0, 5000))
+    return form_data
+
+
+def comparable(results):
+    """Results as plain JSON values with NaN spelled as a string, so overflowing scenarios compare equal."""
+    return json.loads(json.dumps(results, default=calculator.json_default), parse_constant=str)
+
+
+def test_batch_matches_scalar_projections():
+    rng = random.Random(1)
+    forms = [random_form(rng) for _ in range(2000)]
+    batch = calculator.calculate_all_projections_batch(forms)
+    for form_data, result in zip(forms, batch):
+        assert comparable(result) == comparable(calculator.calculate_all_projections(form_data)), form_data
+
+
+def test_batch_with_only_empty_horizons():
+    rng = random.Random(2)
+    forms = [dict(random_form(rng), time_horizon=str(horizon)) for horizon in (0, -3)]
+    batch = calculator.calculate_all_projections_batch(forms)
+    for form_data, result in zip(forms, batch):
+        assert list(result['projected_data']['years']) == []
+        assert comparable(result) == comparable(calculator.calculate_all_projections(form_data))
@@ -0,0 +1,33 @@
+"""
+Checks that goal seek answers reach their target and that /api/goal_seek
+rejects years outside the time horizon.
+
+Run from this directory:
+
+    python -m pytest -q
+"""
+import logging
+
+import pytest
+
+import app as calculator
+from test_portfolio_projections import holding_form
+
+
+calculator.app.logger.setLevel(logging.CRITICAL)
+
+
+@pytest.mark.parametrize('solve_for', sorted(calculator.GOAL_SEEK_VARIABLES))
+@pytest.mark.parametrize('year', [None, 7])
+def test_solution_reaches_target(solve_for, year):
+    inputs = calculator.parse_projection_inputs(holding_form())
+    solution = calculator.solve_goal_seek(inputs, solve_for, 25000, year)
+    assert solution['achieved_after_tax_income'] >= 25000
+    assert solution['year'] == (year or inputs['time_horizon'])
+
+
+def test_year_past_horizon_is_rejected():
+    scenario = dict(holding_form(), solve_for='initial_shares', target_income='25000', year='16')
+    response = calculator.app.test_client().post('/api/goal_seek', json=scenario)
+    assert response.status_code == 400
+    assert 'time horizon' in response.get_json()['error']
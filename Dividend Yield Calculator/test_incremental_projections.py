@@ -0,0 +1,35 @@
+"""
+Checks that projections resumed from stored checkpoints equal a full run.
+
+Run from this directory:
+
+    python -m pytest -q
+"""
+import logging
+
+import pytest
+
+import app as calculator
+from test_batch_projections import comparable
+from test_portfolio_projections import holding_form
+
+
+calculator.app.logger.setLevel(logging.CRITICAL)
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'drip_toggle': 'off'},
+    {'drip_compounding': 'per_payout', 'annual_contribution': '1200'},
+])
+def test_resumed_projection_matches_full_run(overrides):
+    calculator.projection_checkpoints.clear()
+    for horizon in (5, 12, 30, 8):
+        inputs = calculator.parse_projection_inputs(holding_form(time_horizon=str(horizon), **overrides))
+        expected = calculator.calculate_projections_from_inputs(inputs)
+        assert comparable(calculator.calculate_projections_incremental(inputs)) == comparable(expected), horizon
+
+    # Only the inflation rate changes: served from the stored checkpoints
+    inputs = calculator.parse_projection_inputs(holding_form(time_horizon='20', inflation_rate='6', **overrides))
+    expected = calculator.calculate_projections_from_inputs(inputs)
+    assert comparable(calculator.calculate_projections_incremental(inputs)) == comparable(expected)
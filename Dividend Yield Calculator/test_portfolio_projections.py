@@ -0,0 +1,61 @@
+"""
+Checks that portfolio projections match single-scenario projections where
+they should, and tax the holdings' combined income where they should not.
+
+Run from this directory:
+
+    python -m pytest -q
+"""
+import logging
+
+import pytest
+
+import app as calculator
+from test_batch_projections import comparable
+
+
+calculator.app.logger.setLevel(logging.CRITICAL)
+
+
+def holding_form(**overrides):
+    form_data = {
+        'initial_shares': '1000',
+        'current_price': '50',
+        'yield_type': 'indicated',
+        'annual_dividend_indicated': '2',
+        'dividend_frequency': 'quarterly',
+        'dividend_growth_rate': '5',
+        'share_price_growth_rate': '4',
+        'time_horizon': '15',
+        'tax_exemption_threshold': '0',
+        'inflation_rate': '2',
+        'dividend_tax_brackets_input': '0:10,3000:30',
+        'drip_toggle': 'on',
+    }
+    form_data.update(overrides)
+    return form_data
+
+
+def test_single_holding_matches_scalar_projections():
+    form_data = holding_form()
+    projection = calculator.calculate_portfolio_projections([form_data], form_data)
+    expected = calculator.calculate_all_projections(form_data)
+    assert comparable(projection['holdings'][0]) == comparable(expected)
+    assert projection['portfolio']['total_cumulative_after_tax_income'] == expected['total_cumulative_after_tax_income']
+
+
+def test_combined_income_crossing_a_bracket_pays_more_tax():
+    # Each holding pays 2000 a year, under the 3000 bracket; together they are over it
+    forms = [holding_form(drip_toggle='off'), holding_form(drip_toggle='off', current_price='40')]
+    separate = [calculator.calculate_all_projections(form_data) for form_data in forms]
+    first_year_gross = sum(results['projected_data']['annual_gross_income'][0] for results in separate)
+    assert all(results['projected_data']['annual_gross_income'][0] < 3000 for results in separate)
+    assert first_year_gross > 3000
+
+    portfolio = calculator.calculate_portfolio_projections(forms, forms[0])['portfolio']
+    separate_tax = sum(results['total_cumulative_gross_income'] - results['total_cumulative_after_tax_income']
+                       for results in separate)
+    pooled_tax = portfolio['total_cumulative_gross_income'] - portfolio['total_cumulative_after_tax_income']
+    assert portfolio['total_cumulative_gross_income'] == pytest.approx(
+        sum(results['total_cumulative_gross_income'] for results in separate), abs=0.02)
+    assert pooled_tax > separate_tax + 1
@@ -0,0 +1,69 @@
+"""
+Checks that /upload_scenarios projects valid rows and reports invalid ones
+inline without stopping the file.
+
+Run from this directory:
+
+    python -m pytest -q
+"""
+import csv
+import io
+import json
+import logging
+
+import app as calculator
+from test_portfolio_projections import holding_form
+
+
+calculator.app.logger.setLevel(logging.CRITICAL)
+
+FIELDS = ['scenario_id'] + sorted(holding_form())
+
+
+def upload(body, content_type):
+    response = calculator.app.test_client().post('/upload_scenarios', data=body, content_type=content_type)
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == calculator.UPLOAD_RESULT_HEADERS
+    return rows[1:]
+
+
+def rows_by_scenario(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[1], []).append(row)
+    return grouped
+
+
+def test_csv_rows_with_errors_and_extra_fields():
+    valid = dict(holding_form(), scenario_id='valid')
+    body = io.StringIO()
+    writer = csv.writer(body)
+    writer.writerow(FIELDS)
+    writer.writerow([valid[field] for field in FIELDS])
+    writer.writerow([dict(valid, scenario_id='negative', initial_shares='-5')[field] for field in FIELDS])
+    writer.writerow([dict(valid, scenario_id='extra')[field] for field in FIELDS] + ['surplus'])
+    writer.writerow([dict(valid, scenario_id='last')[field] for field in FIELDS])
+    grouped = rows_by_scenario(upload(body.getvalue(), 'text/csv'))
+
+    assert len(grouped['valid']) == 15 and len(grouped['last']) == 15
+    assert all(row[0] == '2' and row[2] == '' for row in grouped['valid'])
+    [negative] = grouped['negative']
+    assert negative[0] == '3' and 'Initial Shares' in negative[2]
+    [extra] = grouped['']
+    assert extra[0] == '4' and extra[2] == "Row has more fields than the header."
+
+
+def test_jsonl_rows_with_errors():
+    lines = [
+        json.dumps(dict(holding_form(), scenario_id='valid')),
+        '{not json',
+        json.dumps(dict(holding_form(), scenario_id='horizon', time_horizon='5000')),
+    ]
+    grouped = rows_by_scenario(upload('\n'.join(lines), 'application/x-ndjson'))
+
+    assert len(grouped['valid']) == 15
+    [invalid_json] = grouped['']
+    assert invalid_json[0] == '2' and invalid_json[2].startswith("Invalid JSON")
+    [horizon] = grouped['horizon']
+    assert horizon[0] == '3' and 'cannot exceed' in horizon[2]